@@ -0,0 +1,237 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Seconds between aggregation runs
+DEFAULT_INTERVAL = 60
+# chat_history rows folded into the aggregates per transaction
+DEFAULT_BATCH_SIZE = 2000
+# Prompts are grouped by their first characters after normalization
+PROMPT_KEY_CHARS = 200
+
+
+def _prompt_key(message):
+    return ' '.join(message.lower().split())[:PROMPT_KEY_CHARS]
+
+
+def _is_error(message):
+    return message.startswith('Error')
+
+
+def _get_watermark(conn, name, default):
+    row = conn.execute('SELECT value FROM analytics_watermark WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_watermark(conn, name, value):
+    conn.execute(
+        '''
+        INSERT INTO analytics_watermark (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = excluded.value
+        ''',
+        (name, value)
+    )
+
+
+def mark_messages_counted(conn, after_id, upto_id):
+    """Move the message watermark from `after_id` to `upto_id` without counting the rows between
+
+    For rows whose usage is already in the aggregates, e.g. history restored
+    into the database it was exported from. Returns False and leaves the
+    watermark alone if rows up to `after_id` are not all counted yet. The
+    caller commits.
+    """
+    if _get_watermark(conn, 'chat_history.id', 0) < after_id:
+        return False
+    _set_watermark(conn, 'chat_history.id', upto_id)
+    return True
+
+
+class UsageAggregator:
+    def __init__(self, db_path, batch_size=DEFAULT_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+
+    def _fold_messages(self, conn):
+        """Add chat_history rows past the watermark to the daily aggregates"""
+        folded = 0
+        while not self._stop.is_set():
+            last_id = _get_watermark(conn, 'chat_history.id', 0)
+            rows = conn.execute(
+                '''
+                SELECT id, user_id, role, message, substr(timestamp, 1, 10) FROM chat_history
+                WHERE id > ? ORDER BY id LIMIT ?
+                ''',
+                (last_id, self.batch_size)
+            ).fetchall()
+            if not rows:
+                break
+
+            daily = {}
+            per_user = {}
+            per_prompt = {}
+            for _, user_id, role, message, day in rows:
+                counts = daily.setdefault(day, [0, 0, 0])
+                if role == 'user':
+                    counts[0] += 1
+                    per_user[(day, user_id)] = per_user.get((day, user_id), 0) + 1
+                    key = _prompt_key(message)
+                    per_prompt[(day, key)] = per_prompt.get((day, key), 0) + 1
+                elif role == 'assistant':
+                    counts[1] += 1
+                    if _is_error(message):
+                        counts[2] += 1
+
+            try:
+                conn.executemany(
+                    '''
+                    INSERT INTO usage_daily (day, prompts, responses, errors) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(day) DO UPDATE SET
+                        prompts = prompts + excluded.prompts,
+                        responses = responses + excluded.responses,
+                        errors = errors + excluded.errors
+                    ''',
+                    [(day, *counts) for day, counts in daily.items()]
+                )
+                conn.executemany(
+                    '''
+                    INSERT INTO usage_user_daily (day, user_id, prompts) VALUES (?, ?, ?)
+                    ON CONFLICT(day, user_id) DO UPDATE SET prompts = prompts + excluded.prompts
+                    ''',
+                    [(day, user_id, count) for (day, user_id), count in per_user.items()]
+                )
+                conn.executemany(
+                    '''
+                    INSERT INTO usage_prompt_daily (day, prompt, prompts) VALUES (?, ?, ?)
+                    ON CONFLICT(day, prompt) DO UPDATE SET prompts = prompts + excluded.prompts
+                    ''',
+                    [(day, prompt, count) for (day, prompt), count in per_prompt.items()]
+                )
+                # The watermark moves in the same transaction as the counters,
+                # so a crash can never count a row twice
+                _set_watermark(conn, 'chat_history.id', rows[-1][0])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            folded += len(rows)
+        return folded
+
+    def _fold_logins(self, conn):
+        """Record users whose last_login moved past the watermark as active that day"""
+        since = _get_watermark(conn, 'users.last_login', '')
+        # last_login has one-second resolution, so a login in the same second
+        # as the watermark is read again; the insert ignores repeats
+        rows = conn.execute(
+            'SELECT id, last_login FROM users WHERE last_login >= ? ORDER BY last_login',
+            (since,)
+        ).fetchall()
+        if not rows:
+            return 0
+        try:
+            conn.executemany(
+                'INSERT OR IGNORE INTO usage_active_daily (day, user_id) VALUES (?, ?)',
+                [(str(last_login)[:10], user_id) for user_id, last_login in rows]
+            )
+            _set_watermark(conn, 'users.last_login', rows[-1][1])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(rows)
+
+    def run_once(self):
+        conn = self._connect()
+        try:
+            return self._fold_messages(conn) + self._fold_logins(conn)
+        except Exception as e:
+            print(f"Usage aggregation error: {str(e)}")
+            return 0
+        finally:
+            conn.close()
+
+    def _loop(self, interval):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(interval)
+
+    def start(self, interval=DEFAULT_INTERVAL):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                        name='usage-analytics', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def start_background_aggregation(db_path):
+    """Start the process-wide aggregation thread once"""
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = UsageAggregator(db_path)
+            _aggregator.start(int(os.getenv('ANALYTICS_INTERVAL', DEFAULT_INTERVAL)))
+        return _aggregator
+
+
+# Dashboard queries: all read the aggregate tables only, so their cost is
+# proportional to the number of days shown, not the number of messages
+
+def daily_usage(conn, since_day):
+    """Rows of (day, prompts, responses, errors, active_users) from `since_day` on
+
+    Includes days with logins but no messages.
+    """
+    return conn.execute(
+        '''
+        SELECT days.day, COALESCE(d.prompts, 0), COALESCE(d.responses, 0), COALESCE(d.errors, 0),
+               (SELECT COUNT(*) FROM usage_active_daily a WHERE a.day = days.day)
+        FROM (SELECT day FROM usage_daily WHERE day >= ?
+              UNION SELECT day FROM usage_active_daily WHERE day >= ?) days
+        LEFT JOIN usage_daily d ON d.day = days.day
+        ORDER BY days.day
+        ''',
+        (since_day, since_day)
+    ).fetchall()
+
+
+def active_users(conn, day):
+    return conn.execute('SELECT COUNT(*) FROM usage_active_daily WHERE day = ?', (day,)).fetchone()[0]
+
+
+def top_prompts(conn, since_day, limit=10):
+    return conn.execute(
+        '''
+        SELECT prompt, SUM(prompts) AS total FROM usage_prompt_daily
+        WHERE day >= ? GROUP BY prompt ORDER BY total DESC LIMIT ?
+        ''',
+        (since_day, limit)
+    ).fetchall()
+
+
+def prompts_per_user(conn, since_day, limit=20):
+    return conn.execute(
+        '''
+        SELECT u.username, SUM(d.prompts) AS total FROM usage_user_daily d
+        LEFT JOIN users u ON u.id = d.user_id
+        WHERE d.day >= ? GROUP BY d.user_id ORDER BY total DESC LIMIT ?
+        ''',
+        (since_day, limit)
+    ).fetchall()
@@ -0,0 +1,175 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from message_store import load_contents
+
+# Token budget for the history sent with each request (summary + recent turns)
+DEFAULT_CONTEXT_BUDGET = 3000
+# Share of the budget the rolling summary may use
+SUMMARY_SHARE = 0.25
+# Conversations whose summaries are kept in memory
+MAX_CACHED_CONVERSATIONS = 512
+# Longest user prompt copied verbatim into the summary
+MAX_SUMMARY_PROMPT_CHARS = 160
+
+_FUNCTION_RE = re.compile(r'^[A-Za-z_][\w \t\*]*?\b([A-Za-z_]\w*)\s*\([^;{]*\)\s*\{', re.MULTILINE)
+_WORD_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text):
+    """Cheap local token estimate: words and punctuation, with long words split every 4 chars"""
+    if not text:
+        return 0
+    count = 0
+    for piece in _WORD_RE.findall(text):
+        count += (len(piece) + 3) // 4
+    return count
+
+
+def _digest(message):
+    # Saved messages are identified by their row, so checking a summary never
+    # reloads a body that was spilled from memory
+    row_id = getattr(message, 'row_id', None)
+    if row_id is not None:
+        return f'{message["role"]}#{row_id}'
+    return hashlib.sha1(f'{message["role"]}\0{message["content"]}'.encode('utf-8')).hexdigest()
+
+
+def _summarize_turn(message):
+    content = message["content"]
+    if message["role"] == "user":
+        text = ' '.join(content.split())
+        if len(text) > MAX_SUMMARY_PROMPT_CHARS:
+            text = text[:MAX_SUMMARY_PROMPT_CHARS] + '...'
+        return f'- User asked: {text}'
+    if content.startswith('Error'):
+        return '- Assistant could not answer (error).'
+    functions = [name for name in _FUNCTION_RE.findall(content)
+                 if name not in ('if', 'for', 'while', 'switch')]
+    if functions:
+        return f'- Assistant wrote C code defining: {", ".join(dict.fromkeys(functions))}'
+    return '- Assistant replied with C code.'
+
+
+def _truncated(message, budget):
+    """Copy of `message` cut to fit `budget` tokens, keeping its first and last lines"""
+    content = message["content"]
+    keep = len(content) * budget // max(estimate_tokens(content), 1)
+    while keep > 0:
+        head = content[:keep // 2]
+        tail = content[len(content) - keep // 2:]
+        # Cut on line boundaries where there are any
+        if '\n' in head:
+            head = head[:head.rindex('\n')]
+        if '\n' in tail:
+            tail = tail[tail.index('\n') + 1:]
+        omitted = len(content) - len(head) - len(tail)
+        text = f'{head}\n/* ... {omitted} characters omitted ... */\n{tail}'
+        if estimate_tokens(text) <= budget:
+            return {"role": message["role"], "content": text}
+        keep = keep * 9 // 10
+    return {"role": message["role"], "content": f'/* ... {len(content)} characters omitted ... */'}
+
+
+class _Summary:
+    __slots__ = ('covered', 'last_digest', 'lines', 'dropped')
+
+    def __init__(self):
+        self.covered = 0
+        self.last_digest = None
+        self.lines = []
+        self.dropped = 0
+
+
+class ContextBuilder:
+    def __init__(self, budget=DEFAULT_CONTEXT_BUDGET):
+        self.budget = budget
+        self.summary_budget = int(budget * SUMMARY_SHARE)
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_summary(self, conversation_id, messages):
+        summary = self._summaries.get(conversation_id)
+        if summary is not None:
+            self._summaries.move_to_end(conversation_id)
+            # The chat was cleared or replaced, start over
+            if (summary.covered > len(messages) or
+                    (summary.covered and _digest(messages[summary.covered - 1]) != summary.last_digest)):
+                summary = None
+        if summary is None:
+            summary = _Summary()
+            self._summaries[conversation_id] = summary
+            while len(self._summaries) > MAX_CACHED_CONVERSATIONS:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _extend_summary(self, summary, history, turns):
+        """Fold `turns`, the loaded history items from summary.covered on, into the rolling summary"""
+        if not turns:
+            return
+        for message in turns:
+            summary.lines.append(_summarize_turn(message))
+        summary.covered += len(turns)
+        summary.last_digest = _digest(history[summary.covered - 1])
+        # Oldest summary lines go first once the summary outgrows its share
+        while summary.lines and estimate_tokens('\n'.join(summary.lines)) > self.summary_budget:
+            summary.lines.pop(0)
+            summary.dropped += 1
+
+    def _summary_text(self, summary):
+        if not summary.lines:
+            return None
+        header = 'Earlier in this conversation:'
+        if summary.dropped:
+            header += f' ({summary.dropped} older turns omitted)'
+        return header + '\n' + '\n'.join(summary.lines)
+
+    def build(self, conversation_id, history):
+        """Return (summary_text, recent_turns) that fit within the token budget
+
+        `history` is the list of {"role", "content"} messages that precede the
+        current prompt. The newest turns are kept verbatim; everything older
+        is represented by the cached rolling summary.
+        """
+        with self._lock:
+            summary = self._get_summary(conversation_id, history)
+            # Only turns not summarized yet are read, with any spilled bodies
+            # loaded in one query
+            pending = load_contents(history[summary.covered:])
+            remaining = self.budget - self.summary_budget
+            start = len(pending)
+            while start > 0:
+                cost = estimate_tokens(pending[start - 1]["content"])
+                if cost > remaining:
+                    break
+                remaining -= cost
+                start -= 1
+            if pending and start == len(pending):
+                # The newest turn alone is over budget. A follow-up most likely
+                # refers to it, so send a cut-down copy instead of summarizing
+                # it; it is folded once a newer turn arrives
+                self._extend_summary(summary, history, pending[:-1])
+                return self._summary_text(summary), [_truncated(pending[-1], remaining)]
+            # Never unfold turns that were already summarized; the summary only
+            # grows forward so the request prefix stays identical between calls
+            self._extend_summary(summary, history, pending[:start])
+            return self._summary_text(summary), pending[start:]
+
+
+def to_gemini_contents(recent_turns, prompt_text):
+    """Convert chat messages to Gemini `contents`, ending with the current prompt"""
+    contents = []
+    for message in recent_turns:
+        role = "model" if message["role"] == "assistant" else "user"
+        if contents and contents[-1]["role"] == role:
+            # Gemini expects alternating roles, merge consecutive turns
+            contents[-1]["parts"].append({"text": message["content"]})
+        else:
+            contents.append({"role": role, "parts": [{"text": message["content"]}]})
+    if contents and contents[-1]["role"] == "user":
+        contents[-1]["parts"].append({"text": prompt_text})
+    else:
+        contents.append({"role": "user", "parts": [{"text": prompt_text}]})
+    return contents
@@ -2,6 +2,8 @@ import sqlite3
 import hashlib
 from datetime import datetime
 import os
+from retention import unpack_turns
+from migrations import ensure_migrated
 
 class Database:
     def __init__(self):
@@ -13,6 +15,8 @@ class Database:
             # Create database connection with explicit path
             self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self.cursor = self.conn.cursor()
+            # Every session opens its own connection; keep each page cache small
+            self.cursor.execute('PRAGMA cache_size = -512')
             print(f"Database connected successfully at: {self.db_path}")
             self._create_tables()
         except Exception as e:
@@ -21,46 +25,8 @@ class Database:
     
     def _create_tables(self):
         try:
-            # Create users table if it doesn't exist
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP DEFAULT NULL
-            )
-            ''')
-            
-            # Check if last_login column exists, if not add it
-            self.cursor.execute("PRAGMA table_info(users)")
-            columns = [column[1] for column in self.cursor.fetchall()]
-            if 'last_login' not in columns:
-                self.cursor.execute('ALTER TABLE users ADD COLUMN last_login TIMESTAMP DEFAULT NULL')
-            
-            # Create chat_history table if it doesn't exist
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chat_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                role TEXT NOT NULL,
-                message TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-            ''')
-            
-            # Create user_state table if it doesn't exist
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_state (
-                user_id INTEGER PRIMARY KEY,
-                last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                session_data TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-            ''')
-            
-            self.conn.commit()
+            # Schema and indexes are owned by migrations.py; applied once per process
+            ensure_migrated(self.conn, self.db_path)
             print("Database tables verified successfully")
         except Exception as e:
             print(f"Error creating tables: {str(e)}")
@@ -108,21 +74,64 @@ class Database:
             print(f"Error verifying user: {str(e)}")
             return None
     
-    def save_chat_message(self, user_id, role, message):
+    def save_chat_message(self, user_id, role, message, model=None):
         try:
-            self.cursor.execute('INSERT INTO chat_history (user_id, role, message) VALUES (?, ?, ?)',
-                         (user_id, role, message))
+            # model is set only for replies generated by Gemini
+            self.cursor.execute('INSERT INTO chat_history (user_id, role, message, model) VALUES (?, ?, ?, ?)',
+                         (user_id, role, message, model))
             self.conn.commit()
-            return True
+            # The row id lets sessions drop the message body and reload it later
+            return self.cursor.lastrowid
         except Exception as e:
             print(f"Error saving chat message: {str(e)}")
             return False
     
+    def get_chat_message(self, message_id):
+        try:
+            self.cursor.execute('SELECT message FROM chat_history WHERE id = ?', (message_id,))
+            result = self.cursor.fetchone()
+            return result[0] if result else None
+        except Exception as e:
+            print(f"Error fetching chat message: {str(e)}")
+            return None
+    
+    def get_chat_messages(self, message_ids):
+        """Bodies of several chat_history rows as {id: message}, in as few queries as possible"""
+        try:
+            message_ids = list(message_ids)
+            messages = {}
+            # Stay below SQLite's default limit of 999 bound parameters
+            for start in range(0, len(message_ids), 500):
+                chunk = message_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                self.cursor.execute(f'SELECT id, message FROM chat_history WHERE id IN ({placeholders})',
+                             chunk)
+                messages.update(self.cursor.fetchall())
+            return messages
+        except Exception as e:
+            print(f"Error fetching chat messages: {str(e)}")
+            return {}
+    
     def get_chat_history(self, user_id):
         try:
-            self.cursor.execute('SELECT role, message, timestamp FROM chat_history WHERE user_id = ? ORDER BY timestamp',
-                         (user_id,))
-            return self.cursor.fetchall()
+            # Both tiers are read in one transaction, so an archival batch
+            # cannot move rows between the two reads
+            self.cursor.execute('BEGIN')
+            try:
+                # Archived turns are always older than the hot table, so read them first
+                self.cursor.execute('SELECT payload FROM chat_history_archive WHERE user_id = ? ORDER BY month',
+                             (user_id,))
+                archived = self.cursor.fetchall()
+                self.cursor.execute('SELECT role, message, timestamp FROM chat_history WHERE user_id = ? ORDER BY timestamp',
+                             (user_id,))
+                recent = self.cursor.fetchall()
+            finally:
+                self.conn.commit()
+            history = []
+            for (payload,) in archived:
+                history.extend(unpack_turns(payload))
+            history.extend(recent)
+            return history
         except Exception as e:
             print(f"Error fetching chat history: {str(e)}")
             return []
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import sqlite3
+
+from analytics import UsageAggregator, mark_messages_counted
+from migrations import ensure_migrated
+from retention import pause_archival, resume_archival, unpack_turns
+
+# Rows held in memory at once, for both export and import
+DEFAULT_BATCH_SIZE = 1000
+COLUMNS = ['user_id', 'username', 'role', 'message', 'timestamp']
+# Upper bound on how long an export keeps archival paused, should it die
+# without resuming it
+ARCHIVAL_PAUSE_SECONDS = 6 * 3600
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('PRAGMA busy_timeout = 30000')
+    ensure_migrated(conn, db_path)
+    return conn
+
+
+def iter_history_batches(conn, user_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of (user_id, username, role, message, timestamp) rows, archive tier first
+
+    The tiers are read one after the other; callers pause archival around
+    this so no row moves from the hot table to the archive in between.
+    """
+    where = 'WHERE a.user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+
+    cursor = conn.execute(f'''
+        SELECT a.user_id, u.username, a.payload FROM chat_history_archive a
+        LEFT JOIN users u ON u.id = a.user_id
+        {where} ORDER BY a.user_id, a.month
+    ''', params)
+    batch = []
+    # One archive row (a user-month) is decompressed at a time
+    for archived_user, username, payload in cursor:
+        for role, message, timestamp in unpack_turns(payload):
+            batch.append((archived_user, username, role, message, timestamp))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+    where = 'WHERE h.user_id = ?' if user_id is not None else ''
+    cursor = conn.execute(f'''
+        SELECT h.user_id, u.username, h.role, h.message, h.timestamp FROM chat_history h
+        LEFT JOIN users u ON u.id = h.user_id
+        {where} ORDER BY h.id
+    ''', params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def export_history(db_path, out_path, fmt='jsonl', user_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream chat history to a JSONL or Parquet file; returns the number of rows written"""
+    conn = _connect(db_path)
+    written = 0
+    pause_archival(conn, ARCHIVAL_PAUSE_SECONDS)
+    try:
+        if fmt == 'jsonl':
+            with open(out_path, 'w', encoding='utf-8') as f:
+                for rows in iter_history_batches(conn, user_id, batch_size):
+                    for row in rows:
+                        f.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False))
+                        f.write('\n')
+                    written += len(rows)
+        elif fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema([
+                ('user_id', pa.int64()),
+                ('username', pa.string()),
+                ('role', pa.string()),
+                ('message', pa.string()),
+                ('timestamp', pa.string()),
+            ])
+            with pq.ParquetWriter(out_path, schema) as writer:
+                for rows in iter_history_batches(conn, user_id, batch_size):
+                    columns = [list(column) for column in zip(*rows)]
+                    writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+                    written += len(rows)
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        return written
+    finally:
+        resume_archival(conn)
+        conn.close()
+
+
+def _iter_import_batches(in_path, fmt, batch_size):
+    """Yield lists of (username, role, message, timestamp); exported user ids are not reused"""
+    if fmt == 'jsonl':
+        batch = []
+        with open(in_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                batch.append((record['username'], record['role'], record['message'], record['timestamp']))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(in_path)
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size,
+                                                      columns=['username', 'role', 'message', 'timestamp']):
+            yield list(zip(*(record_batch.column(i).to_pylist() for i in range(record_batch.num_columns))))
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def import_history(db_path, in_path, fmt='jsonl', batch_size=DEFAULT_BATCH_SIZE, already_counted=False):
+    """Bulk load an export into chat_history in a single transaction
+
+    Messages are attached to the account with the same username in the
+    target database; messages of usernames with no account there are
+    skipped, since passwords are not exported. Restored messages are added
+    to the usage aggregates unless `already_counted` is set (restoring into
+    the database the export came from). Returns (rows inserted, {username:
+    messages skipped}).
+    """
+    if already_counted:
+        # Fold live messages first, so the watermark can move past the import
+        UsageAggregator(db_path).run_once()
+    conn = _connect(db_path)
+    inserted = 0
+    skipped = {}
+    user_ids = {}
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM chat_history').fetchone()[0]
+        for batch in _iter_import_batches(in_path, fmt, batch_size):
+            rows = []
+            for username, role, message, timestamp in batch:
+                if username not in user_ids:
+                    row = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+                    user_ids[username] = row[0] if row else None
+                if user_ids[username] is None:
+                    skipped[username] = skipped.get(username, 0) + 1
+                    continue
+                rows.append((user_ids[username], role, message, timestamp))
+            conn.executemany(
+                'INSERT INTO chat_history (user_id, role, message, timestamp) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            inserted += len(rows)
+        if already_counted and inserted:
+            last_id = conn.execute('SELECT MAX(id) FROM chat_history').fetchone()[0]
+            if not mark_messages_counted(conn, first_id, last_id):
+                print("Warning: messages saved during the import were not yet counted; "
+                      "the imported messages will be counted in the usage aggregates")
+        conn.commit()
+        return inserted, skipped
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _format_from_path(path):
+    return 'parquet' if path.endswith('.parquet') else 'jsonl'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import chat history")
+    parser.add_argument('--db', default=os.path.join(os.getcwd(), 'chat_app.db'),
+                        help="SQLite database path (default: ./chat_app.db)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Write chat history to a file")
+    export_parser.add_argument('path', help="Output file (.jsonl or .parquet)")
+    export_parser.add_argument('--user-id', type=int, default=None, help="Only export this user")
+
+    import_parser = subparsers.add_parser('import', help="Load chat history from an export")
+    import_parser.add_argument('path', help="Input file (.jsonl or .parquet)")
+    import_parser.add_argument('--already-counted', action='store_true',
+                               help="The messages are already in this database's usage aggregates "
+                                    "(restoring into the database they were exported from); "
+                                    "without it the dashboard counts them again")
+
+    args = parser.parse_args()
+    fmt = _format_from_path(args.path)
+    if args.command == 'export':
+        count = export_history(args.db, args.path, fmt, args.user_id, args.batch_size)
+        print(f"Exported {count} messages to {args.path}")
+    else:
+        count, skipped = import_history(args.db, args.path, fmt, args.batch_size, args.already_counted)
+        print(f"Imported {count} messages from {args.path}")
+        for username, messages in skipped.items():
+            if username is None:
+                print(f"Skipped {messages} messages of deleted users")
+            else:
+                print(f"Skipped {messages} messages of {username}: no account with that username")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import sys
+import threading
+import weakref
+
+# Newest messages kept in memory per session, and the byte budget for them;
+# older bodies are dropped and reloaded from chat_history by row id
+DEFAULT_WINDOW = 20
+DEFAULT_BYTE_BUDGET = 64 * 1024
+# Shown if a spilled message can no longer be found (e.g. it was archived)
+UNAVAILABLE = "[message no longer available]"
+
+_stores = weakref.WeakSet()
+_stores_lock = threading.Lock()
+
+
+class Message:
+    """A chat message whose body may live only in chat_history
+
+    Supports message["role"] / message["content"] so it can be used wherever
+    the plain {"role", "content"} dicts were.
+    """
+    __slots__ = ('role', 'row_id', '_content', '_store')
+
+    def __init__(self, role, content, row_id, store):
+        self.role = role
+        self.row_id = row_id
+        self._content = content
+        self._store = store
+
+    @property
+    def resident(self):
+        return self._content is not None
+
+    @property
+    def content(self):
+        if self._content is not None:
+            return self._content
+        return self._store._load(self.row_id)
+
+    def __getitem__(self, key):
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class MessageStore:
+    """Per-session chat messages with a bounded in-memory window"""
+
+    def __init__(self, db=None, label=None, window=DEFAULT_WINDOW, byte_budget=DEFAULT_BYTE_BUDGET):
+        self.db = db
+        self.label = label
+        self.window = window
+        self.byte_budget = byte_budget
+        self._messages = []
+        self._resident_bytes = 0
+        # Index of the oldest message that may still hold its body
+        self._resident_start = 0
+        with _stores_lock:
+            _stores.add(self)
+
+    def append(self, role, content, row_id=None):
+        self._messages.append(Message(role, content, row_id, self))
+        self._resident_bytes += sys.getsizeof(content)
+        self._spill()
+
+    def _spill(self):
+        """Drop the oldest resident bodies until the window and byte budget are met"""
+        index = self._resident_start
+        newest = len(self._messages) - 1
+        while index < newest:
+            resident = len(self._messages) - index
+            if resident <= self.window and self._resident_bytes <= self.byte_budget:
+                break
+            message = self._messages[index]
+            # Messages that were never saved have nowhere to be reloaded from
+            if message.row_id is not None and message._content is not None:
+                self._resident_bytes -= sys.getsizeof(message._content)
+                message._content = None
+            index += 1
+        self._resident_start = index
+
+    def _load(self, row_id):
+        if self.db is None:
+            return UNAVAILABLE
+        content = self.db.get_chat_message(row_id)
+        return content if content is not None else UNAVAILABLE
+
+    def _load_many(self, row_ids):
+        if self.db is None:
+            return {}
+        return self.db.get_chat_messages(row_ids)
+
+    def recent(self, count=None):
+        """The newest `count` messages (default: those still held in memory)"""
+        if count is None:
+            return self._messages[self._resident_start:]
+        return self._messages[-count:] if count > 0 else []
+
+    def clear(self):
+        self._messages = []
+        self._resident_bytes = 0
+        self._resident_start = 0
+
+    def memory_usage(self):
+        """Approximate bytes held by this store"""
+        return (sys.getsizeof(self._messages) +
+                sum(sys.getsizeof(message) for message in self._messages) +
+                self._resident_bytes)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+
+def load_contents(messages):
+    """Plain {"role", "content"} dicts for `messages`
+
+    Spilled bodies are fetched with one query per store rather than one per
+    message; plain dicts are passed through. Nothing is made resident again.
+    """
+    spilled = {}
+    for message in messages:
+        if isinstance(message, Message) and not message.resident:
+            spilled.setdefault(message._store, []).append(message.row_id)
+    loaded = {}
+    for store, row_ids in spilled.items():
+        loaded.update(store._load_many(row_ids))
+
+    contents = []
+    for message in messages:
+        if isinstance(message, Message) and not message.resident:
+            content = loaded.get(message.row_id, UNAVAILABLE)
+        else:
+            content = message["content"]
+        contents.append({"role": message["role"], "content": content})
+    return contents
+
+
+def memory_report():
+    """Rows of (label, messages, resident messages, bytes) for every live session store"""
+    with _stores_lock:
+        stores = list(_stores)
+    report = []
+    for store in stores:
+        resident = sum(1 for message in store._messages if message.resident)
+        report.append((store.label, len(store), resident, store.memory_usage()))
+    report.sort(key=lambda row: row[3], reverse=True)
+    return report
@@ -0,0 +1,241 @@
+import os
+import sys
+import tempfile
+import threading
+
+
+def _add_last_login(conn):
+    # Databases created before last_login existed
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(users)")]
+    if 'last_login' not in columns:
+        conn.execute('ALTER TABLE users ADD COLUMN last_login TIMESTAMP DEFAULT NULL')
+
+
+# (version, description, steps). A step is an SQL statement or a callable
+# taking the connection. Migrations only ever get appended; every statement
+# tolerates a database that was created before versioning existed.
+MIGRATIONS = [
+    (1, "base schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP DEFAULT NULL
+        )
+        ''',
+        _add_last_login,
+        '''
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            role TEXT NOT NULL,
+            message TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_state (
+            user_id INTEGER PRIMARY KEY,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            session_data TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+    ]),
+    (2, "chat history archive tier", [
+        # Cold tier: turns past the retention window, compressed per user-month
+        '''
+        CREATE TABLE IF NOT EXISTS chat_history_archive (
+            user_id INTEGER,
+            month TEXT NOT NULL,
+            turn_count INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            PRIMARY KEY (user_id, month),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''',
+    ]),
+    (3, "usage aggregates", [
+        # Daily usage aggregates, maintained incrementally by analytics.py
+        '''
+        CREATE TABLE IF NOT EXISTS usage_daily (
+            day TEXT PRIMARY KEY,
+            prompts INTEGER NOT NULL DEFAULT 0,
+            responses INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS usage_user_daily (
+            day TEXT NOT NULL,
+            user_id INTEGER,
+            prompts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, user_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS usage_prompt_daily (
+            day TEXT NOT NULL,
+            prompt TEXT NOT NULL,
+            prompts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, prompt)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS usage_active_daily (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (day, user_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS analytics_watermark (
+            name TEXT PRIMARY KEY,
+            value
+        )
+        ''',
+    ]),
+    (4, "usage quota", [
+        # Per-user daily generation and token totals, flushed by quota.py
+        '''
+        CREATE TABLE IF NOT EXISTS usage_quota (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            generations INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        )
+        ''',
+    ]),
+    (5, "query indexes", [
+        # get_chat_history
+        'CREATE INDEX IF NOT EXISTS idx_chat_history_user_time ON chat_history (user_id, timestamp)',
+        # retention.py archival cutoff
+        'CREATE INDEX IF NOT EXISTS idx_chat_history_time ON chat_history (timestamp)',
+        # user_state by recency
+        'CREATE INDEX IF NOT EXISTS idx_user_state_activity ON user_state (last_activity)',
+        # analytics.py active users watermark
+        'CREATE INDEX IF NOT EXISTS idx_users_last_login ON users (last_login)',
+        'ANALYZE',
+    ]),
+    (6, "generating model per reply", [
+        # NULL for prompts and for answers that never called the API (snippet
+        # library, offline fallback, errors); quota.py only recounts the rest
+        'ALTER TABLE chat_history ADD COLUMN model TEXT DEFAULT NULL',
+    ]),
+    (7, "maintenance state", [
+        # Coordination between maintenance jobs (e.g. retention.py archival
+        # paused during an export), kept apart from the analytics watermarks
+        '''
+        CREATE TABLE IF NOT EXISTS maintenance_state (
+            name TEXT PRIMARY KEY,
+            value
+        )
+        ''',
+        "DELETE FROM analytics_watermark WHERE name = 'retention.paused_until'",
+    ]),
+]
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def migrate(conn):
+    """Apply pending migrations and record the version in PRAGMA user_version"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version == 0:
+        # Only takes effect on a new, empty file; older databases are
+        # converted offline with `python retention.py enable-incremental-vacuum`
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    for target, description, steps in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Another process may have applied it while this one waited for the lock
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if target <= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f'PRAGMA user_version = {int(target)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Applied migration {target}: {description}")
+        version = target
+    return version
+
+
+def ensure_migrated(conn, db_path):
+    """Run migrate() for `db_path` once per process"""
+    with _migrated_lock:
+        if db_path in _migrated:
+            return
+        migrate(conn)
+        _migrated.add(db_path)
+
+
+def _is_full_scan(detail):
+    # "SCAN t" reads every row, and "SCAN t USING INDEX i" walks all of i (e.g.
+    # only to satisfy ORDER BY); lookups show up as "SEARCH"
+    return detail.startswith('SCAN ') and 'CONSTANT ROW' not in detail
+
+
+def check_query_plans():
+    """Run every Database method against a scratch database and EXPLAIN each query
+
+    Statements are captured with a trace callback, so new queries are
+    checked without being listed here. Returns a list of (sql, plan detail)
+    for every full table scan found.
+    """
+    from database import Database
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            db = Database()
+            statements = []
+            db.conn.set_trace_callback(statements.append)
+
+            db.register_user('plan_user', 'secret')
+            user_id = db.verify_user('plan_user', 'secret')
+            db.verify_user('plan_user', 'wrong')
+            message_id = db.save_chat_message(user_id, 'user', 'hello')
+            db.get_chat_message(message_id)
+            db.get_chat_messages([message_id, message_id + 1])
+            db.get_chat_history(user_id)
+            db.save_user_state(user_id, 'plan_user', [])
+            db.get_user_state(user_id)
+
+            db.conn.set_trace_callback(None)
+            problems = []
+            for sql in statements:
+                keyword = sql.lstrip().split(None, 1)[0].upper()
+                if keyword not in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+                    continue
+                for row in db.conn.execute(f'EXPLAIN QUERY PLAN {sql}'):
+                    if _is_full_scan(row[3]):
+                        problems.append((' '.join(sql.split()), row[3]))
+            db.conn.close()
+            return problems
+        finally:
+            os.chdir(previous_dir)
+
+
+if __name__ == "__main__":
+    problems = check_query_plans()
+    for sql, detail in problems:
+        print(f"FULL SCAN: {detail}\n    {sql}")
+    print("Query plan check " + ("failed" if problems else "passed: every Database query uses an index"))
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,205 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+import requests
+
+from context_builder import estimate_tokens
+
+API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+
+# Routing table: complexity tier -> ordered models to try, with the output
+# budget for that tier. Override with a JSON file in MODEL_ROUTES_FILE.
+DEFAULT_ROUTES = {
+    "simple": {
+        "models": ["gemini-2.0-flash-lite", "gemini-2.0-flash"],
+        "max_output_tokens": 1024,
+    },
+    "complex": {
+        "models": ["gemini-2.0-flash", "gemini-2.5-flash"],
+        "max_output_tokens": 4096,
+    },
+    # Used only when GEMINI_SIMULATE is set: per-model stub latency and failure rate
+    "simulate": {
+        "gemini-2.0-flash-lite": {"latency_ms": 300, "error_rate": 0.02},
+        "gemini-2.0-flash": {"latency_ms": 800, "error_rate": 0.02},
+        "gemini-2.5-flash": {"latency_ms": 2000, "error_rate": 0.01},
+    },
+}
+
+# Calls remembered per model for the rolling stats, and how long they count;
+# stale failures age out so a demoted model gets traffic again
+STATS_WINDOW = 50
+STATS_MAX_AGE = 300
+# A model failing more often than this is tried after its alternatives
+MAX_ERROR_RATE = 0.3
+# Fall over to the next model if the preferred one is this many times slower
+LATENCY_FAILOVER_RATIO = 3.0
+REQUEST_TIMEOUT = 60
+
+# Whole words only, so "retrieve" is not a trie and "shell sort" is not a shell
+_COMPLEX_PATTERNS = [re.compile(rf'\b(?:{pattern})\b') for pattern in (
+    r'(?:multi-?)?thread(?:s|ed|ing)?', r'mutex(?:es)?', r'lock-free', r'concurren\w*',
+    r'parallel\w*', r'atomics?', r'sockets?', r'servers?', r'clients?', r'hash ?maps?',
+    r'hash ?tables?', r'red-black', r'avl', r'b-trees?', r'tries|trie', r'graphs?', r'dijkstra',
+    r'parsers?|parsing', r'interpreters?', r'compilers?', r'allocators?', r'malloc implementation',
+    r'garbage', r'schedul\w*', r'shells?(?! sort)', r'file ?systems?', r'cach(?:e|es|ing)', r'lru',
+    r'protocols?', r'encrypt\w*', r'compress\w*', r'huffman', r'generics?', r'signals?', r'ipc',
+    r'pipes?',
+)]
+_REQUIREMENT_RE = re.compile(r'\b(and|with|also|support|handle|must|should)\b|[,;]')
+# A follow-up may have to rewrite the previous reply; one longer than this
+# needs the complex tier's output budget
+FOLLOW_UP_TOKENS = 512
+
+
+def _complexity(text):
+    text = text.lower()
+    score = sum(2 for pattern in _COMPLEX_PATTERNS if pattern.search(text))
+    score += len(_REQUIREMENT_RE.findall(text))
+    score += len(text) // 200
+    return score
+
+
+def classify_prompt(prompt, recent_turns=()):
+    """Classify a request as "simple" or "complex" using local heuristics only
+
+    Follow-ups stay on the conversation's tier: the request is complex if the
+    previous prompt was, or if the previous reply is too long to rewrite
+    within the simple tier's output budget.
+    """
+    if _complexity(prompt) >= 3:
+        return "complex"
+    for turn in reversed(recent_turns):
+        if turn["role"] == "assistant":
+            if estimate_tokens(turn["content"]) > FOLLOW_UP_TOKENS:
+                return "complex"
+        elif turn["role"] == "user":
+            if _complexity(turn["content"]) >= 3:
+                return "complex"
+            break
+    return "simple"
+
+
+class ModelStats:
+    __slots__ = ('calls',)
+
+    def __init__(self):
+        # (monotonic time, latency seconds, succeeded) for the most recent calls
+        self.calls = deque(maxlen=STATS_WINDOW)
+
+    def record(self, latency, ok):
+        self.calls.append((time.monotonic(), latency, ok))
+
+    def _recent(self):
+        horizon = time.monotonic() - STATS_MAX_AGE
+        return [(latency, ok) for when, latency, ok in self.calls if when >= horizon]
+
+    def error_rate(self):
+        calls = self._recent()
+        if not calls:
+            return 0.0
+        return sum(1 for _, ok in calls if not ok) / len(calls)
+
+    def mean_latency(self):
+        latencies = [latency for latency, ok in self._recent() if ok]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+    def as_dict(self):
+        return {
+            "calls": len(self._recent()),
+            "error_rate": round(self.error_rate(), 3),
+            "mean_latency": self.mean_latency(),
+        }
+
+
+class _StubResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class ModelRouter:
+    def __init__(self, routes=None, simulate=False):
+        self.routes = routes or DEFAULT_ROUTES
+        self.simulate = simulate
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _stats_for(self, model):
+        with self._lock:
+            return self._stats.setdefault(model, ModelStats())
+
+    def _healthy(self, model):
+        return self._stats_for(model).error_rate() <= MAX_ERROR_RATE
+
+    def plan(self, prompt, recent_turns=()):
+        """Return (tier, max_output_tokens, models in the order they should be tried)
+
+        `recent_turns` are the turns sent along with the prompt, so follow-ups
+        are routed by the conversation they continue.
+        """
+        tier = classify_prompt(prompt, recent_turns)
+        route = self.routes[tier]
+        models = list(route["models"])
+        # Unhealthy models keep their relative order but move to the back
+        models.sort(key=lambda model: not self._healthy(model))
+        if len(models) > 1 and self._healthy(models[1]):
+            first = self._stats_for(models[0]).mean_latency()
+            second = self._stats_for(models[1]).mean_latency()
+            if first and second and first > second * LATENCY_FAILOVER_RATIO:
+                models[0], models[1] = models[1], models[0]
+        return tier, route["max_output_tokens"], models
+
+    def _simulated_post(self, model):
+        profile = self.routes.get("simulate", {}).get(model, {})
+        time.sleep(profile.get("latency_ms", 100) / 1000 * random.uniform(0.8, 1.2))
+        if random.random() < profile.get("error_rate", 0.0):
+            return _StubResponse(503, {"error": {"message": "simulated failure"}})
+        text = f"```c\n/* simulated response from {model} */\n#include <stdio.h>\n\nint main(void) {{\n    return 0;\n}}\n```"
+        return _StubResponse(200, {
+            "candidates": [{"content": {"parts": [{"text": text}]}}],
+            "usageMetadata": {"promptTokenCount": 50, "candidatesTokenCount": len(text) // 4},
+        })
+
+    def post(self, model, headers, payload):
+        """Send a generateContent request to `model`, recording its latency and outcome"""
+        started = time.perf_counter()
+        ok = False
+        try:
+            if self.simulate:
+                response = self._simulated_post(model)
+            else:
+                response = requests.post(API_URL.format(model=model), headers=headers,
+                                         json=payload, timeout=REQUEST_TIMEOUT)
+            ok = response.status_code < 500 and response.status_code != 429
+            return response
+        finally:
+            self._stats_for(model).record(time.perf_counter() - started, ok)
+
+    def stats(self):
+        with self._lock:
+            return {model: stats.as_dict() for model, stats in self._stats.items()}
+
+
+def load_router():
+    """Build a router from MODEL_ROUTES_FILE and GEMINI_SIMULATE"""
+    routes = DEFAULT_ROUTES
+    routes_file = os.getenv('MODEL_ROUTES_FILE')
+    if routes_file:
+        try:
+            with open(routes_file) as f:
+                routes = {**DEFAULT_ROUTES, **json.load(f)}
+        except Exception as e:
+            print(f"Could not load model routes from {routes_file}: {str(e)}")
+    simulate = os.getenv('GEMINI_SIMULATE', '').lower() in ('1', 'true', 'yes')
+    return ModelRouter(routes, simulate=simulate)
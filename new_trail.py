@@ -1,10 +1,28 @@
 import os
-import requests
 import streamlit as st
 from dotenv import load_dotenv
 from database import Database
+from retention import start_background_maintenance
+from analytics import start_background_aggregation
+from quota import get_quota_accountant, start_quota_accounting
+from context_builder import ContextBuilder, DEFAULT_CONTEXT_BUDGET, to_gemini_contents
+from model_router import load_router
+from snippet_library import SnippetLibrary
+from message_store import MessageStore, load_contents
+from response_parser import extract_code
+from profiler import profile_rerun, profile_section
+
+# Example queries shown in the sidebar, shared by all sessions
+EXAMPLES = (
+    "Write a program to sort an array using bubble sort",
+    "Create a linked list implementation",
+    "Program to check if a string is palindrome",
+    "Write a program to find factorial of a number",
+    "Create a program for matrix multiplication"
+)
 
 # Custom CSS for better styling
+@profile_section("load_css")
 def load_css():
     st.markdown("""
         <style>
@@ -126,23 +144,43 @@ def load_css():
         </style>
     """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_context_builder():
+    """Process-wide context builder, shared so rolling summaries survive reruns"""
+    load_dotenv()
+    return ContextBuilder(int(os.getenv('CONTEXT_TOKEN_BUDGET', DEFAULT_CONTEXT_BUDGET)))
+
+@st.cache_resource
+def get_model_router():
+    """Process-wide model router, shared so per-model latency/error stats accumulate"""
+    load_dotenv()
+    return load_router()
+
+@st.cache_resource
+def get_snippet_library():
+    """Vetted C programs for common requests, loaded once per process"""
+    return SnippetLibrary()
+
+def offline_answer(prompt):
+    """Closest library program when Gemini cannot be reached, or None"""
+    snippet = get_snippet_library().lookup(prompt, strict=False)
+    if snippet is None:
+        return None
+    st.warning(f"Code generation is unavailable, showing the library program for: {snippet['title']}")
+    return snippet['code']
+
 def init_session_state():
     """Initialize session state variables"""
     if "initialized" not in st.session_state:
         st.session_state.initialized = True
         st.session_state.user_id = None
         st.session_state.username = None
-        st.session_state.messages = []
-        st.session_state.examples = [
-            "Write a program to sort an array using bubble sort",
-            "Create a linked list implementation",
-            "Program to check if a string is palindrome",
-            "Write a program to find factorial of a number",
-            "Create a program for matrix multiplication"
-        ]
+        st.session_state.messages = MessageStore()
+        st.session_state.show_all_messages = False
         st.session_state.db = None
         st.session_state.page = "login"  # Default page
 
+@profile_section("login_page")
 def login_page():
     """Handle login functionality"""
     st.markdown('<h1 class="main-title">Login to C Programming Assistant</h1>', unsafe_allow_html=True)
@@ -166,12 +204,42 @@ def login_page():
         st.query_params["page"] = "signup"
         st.rerun()
 
+def add_message(role, content, model=None):
+    """Save a chat message and append it to the session's message store"""
+    row_id = st.session_state.db.save_chat_message(st.session_state.user_id, role, content, model)
+    st.session_state.messages.append(role, content, row_id or None)
+
+@profile_section("messages")
+def render_messages():
+    """Display chat messages; older ones are only reloaded from the database on request"""
+    if st.session_state.show_all_messages:
+        # Spilled bodies come back in one query, for this run only
+        visible = load_contents(list(st.session_state.messages))
+        st.session_state.show_all_messages = False
+    else:
+        visible = st.session_state.messages.recent()
+    hidden = len(st.session_state.messages) - len(visible)
+    if hidden and st.button(f"Show {hidden} earlier messages"):
+        st.session_state.show_all_messages = True
+        st.rerun()
+    
+    for position, message in enumerate(visible, start=hidden):
+        if message["role"] == "user":
+            with st.chat_message("user", avatar="👤"):
+                st.markdown(f'<div class="user-message">{message["content"]}</div>', unsafe_allow_html=True)
+        elif message["role"] == "assistant":
+            with st.chat_message("assistant", avatar="🤖"):
+                st.code(message["content"], language='c')
+                if st.button("Copy Code", key=f"copy_{position}"):
+                    st.write("Code copied to clipboard!")
+
+@profile_section("chat_page")
 def chat_page():
     """Handle chat interface"""
     st.markdown(f'<h1 class="main-title">Welcome, {st.session_state.username}! </h1>', unsafe_allow_html=True)
     
     # Sidebar
-    with st.sidebar:
+    with st.sidebar, profile_section("sidebar"):
         st.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
         
         # Profile section
@@ -180,25 +248,25 @@ def chat_page():
         
         # Example Queries section
         st.markdown("###  Example Queries")
-        for example in st.session_state.examples:
+        for example in EXAMPLES:
             if st.button(example, key=f"example_{example}"):
-                st.session_state.messages.append({"role": "user", "content": example})
-                st.session_state.db.save_chat_message(st.session_state.user_id, "user", example)
-                response = get_c_code(example)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                st.session_state.db.save_chat_message(st.session_state.user_id, "assistant", response)
+                history = list(st.session_state.messages)
+                add_message("user", example)
+                response, model = get_c_code(example, history, st.session_state.user_id)
+                add_message("assistant", response, model)
                 st.rerun()
         
         # Action buttons
         st.markdown("### Actions")
         if st.button("Clear Chat"):
-            st.session_state.messages = []
+            st.session_state.messages.clear()
+            st.session_state.show_all_messages = False
             st.rerun()
         
         if st.button("Logout"):
             st.session_state.user_id = None
             st.session_state.username = None
-            st.session_state.messages = []
+            st.session_state.messages.clear()
             st.session_state.page = "login"
             st.rerun()
         
@@ -207,39 +275,49 @@ def chat_page():
     # Main chat container
     st.markdown('<div class="chat-container">', unsafe_allow_html=True)
     
-    # Display chat messages
-    for message in st.session_state.messages:
-        if message["role"] == "user":
-            with st.chat_message("user", avatar="👤"):
-                st.markdown(f'<div class="user-message">{message["content"]}</div>', unsafe_allow_html=True)
-        elif message["role"] == "assistant":
-            with st.chat_message("assistant", avatar="🤖"):
-                st.code(message["content"], language='c')
-                if st.button("Copy Code", key=f"copy_{hash(message['content'])}"):
-                    st.write("Code copied to clipboard!")
+    render_messages()
     
     # Chat input
     if prompt := st.chat_input("What C program would you like to create?"):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        st.session_state.db.save_chat_message(st.session_state.user_id, "user", prompt)
+        history = list(st.session_state.messages)
+        add_message("user", prompt)
         
         with st.spinner("🤖 Generating code..."):
-            response = get_c_code(prompt)
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            st.session_state.db.save_chat_message(st.session_state.user_id, "assistant", response)
+            response, model = get_c_code(prompt, history, st.session_state.user_id)
+            add_message("assistant", response, model)
         
         st.rerun()
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def get_c_code(prompt):
-    """Generate C code using Gemini API"""
+def get_c_code(prompt, history=None, conversation_id=None):
+    """Generate C code using Gemini API, with earlier turns of the conversation as context
+
+    Returns (text, model); model is None unless the text was generated by Gemini.
+    """
     try:
+        # Canonical programs are answered locally without an API round trip
+        snippet = get_snippet_library().lookup(prompt)
+        if snippet is not None:
+            return snippet['code'], None
+        
+        # Per-user daily limits, checked against in-memory counters only
+        quota = get_quota_accountant()
+        if quota is not None:
+            limit_message = quota.check(st.session_state.user_id)
+            if limit_message:
+                st.warning(limit_message)
+                return f"Error: {limit_message}", None
+        
         # Load environment variables
         load_dotenv()
         
+        router = get_model_router()
         api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        if not api_key and not router.simulate:
+            fallback = offline_answer(prompt)
+            if fallback is not None:
+                return fallback, None
             error_message = """
             ⚠️ API key not found! Please follow these steps:
             1. Go to https://makersuite.google.com/app/apikey
@@ -251,58 +329,70 @@ def get_c_code(prompt):
             6. Restart the application
             """
             st.error(error_message)
-            return "Error: API key not found. Please check the instructions above."
+            return "Error: API key not found. Please check the instructions above.", None
 
         with st.spinner("🔄 Generating code..."):
-            url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-            
-            payload = {
-                "contents": [
-                    {
-                        "parts": [
-                            {
-                                "text": f"""Write a C program for the following task: {prompt}
+            prompt_text = f"""Write a C program for the following task: {prompt}
                                 Please provide clean, efficient, and well-commented C code.
                                 Include proper error handling where necessary.
                                 Return only the code without any explanation."""
-                            }
-                        ]
-                    }
-                ],
+            
+            # Recent turns verbatim, older ones folded into a bounded rolling summary
+            summary, recent_turns = get_context_builder().build(conversation_id, history or [])
+            
+            # Pick model and output budget from the complexity of the prompt
+            # and the turns it follows up on
+            tier, max_output_tokens, models = router.plan(prompt, recent_turns)
+            
+            payload = {
+                "contents": to_gemini_contents(recent_turns, prompt_text),
                 "generationConfig": {
                     "temperature": 0.7,
                     "topK": 40,
                     "topP": 0.95,
-                    "maxOutputTokens": 2048
+                    "maxOutputTokens": max_output_tokens
                 }
             }
+            if summary:
+                payload["systemInstruction"] = {"parts": [{"text": summary}]}
             
             headers = {
                 'Content-Type': 'application/json',
                 'x-goog-api-key': api_key
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            # Try models in order, falling over on transport errors, 429 and 5xx
+            response = None
+            for model in models:
+                try:
+                    response = router.post(model, headers, payload)
+                except Exception as e:
+                    print(f"Request to {model} failed: {str(e)}")
+                    continue
+                if response.status_code == 200 or (response.status_code < 500 and response.status_code != 429):
+                    break
             
+            if response is None or response.status_code >= 500 or response.status_code == 429:
+                fallback = offline_answer(prompt)
+                if fallback is not None:
+                    return fallback, None
+            if response is None:
+                return "Error: All models failed to respond", None
             if response.status_code == 200:
                 result = response.json()
                 if 'candidates' in result and len(result['candidates']) > 0:
+                    if quota is not None:
+                        quota.record(st.session_state.user_id, result.get('usageMetadata'))
                     text = result['candidates'][0]['content']['parts'][0]['text']
-                    code = text.strip()
-                    if code.startswith('```c'):
-                        code = code[3:]
-                    if code.startswith('```'):
-                        code = code[3:]
-                    if code.endswith('```'):
-                        code = code[:-3]
-                    return code.strip()
+                    return extract_code(text), model
                 else:
-                    return "Error: No code generated in the response"
+                    return "Error: No code generated in the response", None
             else:
-                return f"Error: API request failed with status code {response.status_code}"
+                return f"Error: API request failed with status code {response.status_code}", None
     except Exception as e:
-        return f"Error generating code: {str(e)}"
+        return f"Error generating code: {str(e)}", None
 
+@profile_section("signup_page")
 def signup_page():
     """Handle signup functionality"""
     st.markdown('<h1 class="main-title">Sign Up - C Programming Assistant</h1>', unsafe_allow_html=True)
@@ -330,19 +420,9 @@ def signup_page():
         st.query_params["page"] = "login"
         st.rerun()
 
-def main():
-    # Set page config
-    st.set_page_config(
-        page_title="C Programming Assistant",
-        page_icon="💻",
-        layout="wide",
-        initial_sidebar_state="collapsed"  # Hide sidebar by default
-    )
-    
-    # Initialize session state first
-    init_session_state()
-    
-    # Hide default menu and footer, and add top navigation styling
+@profile_section("nav_css")
+def load_nav_css():
+    """Hide default menu and footer, and add top navigation styling"""
     st.markdown("""
         <style>
         #MainMenu {visibility: hidden;}
@@ -387,8 +467,10 @@ def main():
         }
         </style>
     """, unsafe_allow_html=True)
-    
-    # Top Navigation using Streamlit components instead of HTML
+
+@profile_section("nav")
+def render_nav():
+    """Top navigation buttons"""
     col1, col2, col3 = st.columns([1,2,1])
     with col2:
         cols = st.columns(3)
@@ -407,6 +489,24 @@ def main():
                     st.rerun()
                 else:
                     st.warning("Please login first")
+
+def main():
+    # Set page config
+    st.set_page_config(
+        page_title="C Programming Assistant",
+        page_icon="💻",
+        layout="wide",
+        initial_sidebar_state="collapsed"  # Hide sidebar by default
+    )
+    
+    # Initialize session state first
+    init_session_state()
+    
+    # Hide default menu and footer, and add top navigation styling
+    load_nav_css()
+    
+    # Top Navigation using Streamlit components instead of HTML
+    render_nav()
     
     # Load CSS
     load_css()
@@ -418,6 +518,13 @@ def main():
         except Exception as e:
             st.error(f"Database Error: {str(e)}")
             return
+    st.session_state.messages.db = st.session_state.db
+    st.session_state.messages.label = st.session_state.username
+    
+    # Background jobs (once per process): usage aggregates, then archival and compaction
+    start_background_aggregation(st.session_state.db.db_path)
+    start_background_maintenance(st.session_state.db.db_path)
+    start_quota_accounting(st.session_state.db.db_path)
 
     # Get current page from query params
     current_page = st.query_params.get("page", "login")
@@ -431,4 +538,5 @@ def main():
         login_page()
 
 if __name__ == "__main__":
-    main()
+    with profile_rerun("chat app"):
+        main()
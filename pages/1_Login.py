@@ -1,8 +1,11 @@
 import streamlit as st
 from database import Database
+from message_store import MessageStore
+from profiler import profile_rerun, profile_section
 import time
 
 # Custom CSS for better styling
+@profile_section("load_css")
 def load_css():
     st.markdown("""
         <style>
@@ -99,7 +102,7 @@ if 'user_id' not in st.session_state:
 if 'username' not in st.session_state:
     st.session_state.username = None
 if 'messages' not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = MessageStore()
 
 st.set_page_config(
     page_title="Login - C Programming Assistant",
@@ -157,4 +160,5 @@ def login_page():
     st.markdown("Don't have an account? [Sign Up](/Sign_Up) ✨")
     st.markdown("</div>", unsafe_allow_html=True)
 
-login_page() 
\ No newline at end of file
+with profile_rerun("login"):
+    login_page()
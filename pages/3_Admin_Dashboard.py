@@ -0,0 +1,100 @@
+import os
+from datetime import datetime, timedelta
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import streamlit as st
+from dotenv import load_dotenv
+
+from analytics import active_users, daily_usage, prompts_per_user, top_prompts
+from database import Database
+from message_store import memory_report
+
+st.set_page_config(
+    page_title="Admin Dashboard - C Programming Assistant",
+    page_icon="📊",
+    layout="wide"
+)
+
+# Initialize database in session state if not already initialized
+if 'db' not in st.session_state or st.session_state.db is None:
+    try:
+        st.session_state.db = Database()
+    except Exception as e:
+        st.error(f"Database Error: {str(e)}")
+        st.session_state.db = None
+
+if 'username' not in st.session_state:
+    st.session_state.username = None
+
+def is_admin(username):
+    """Admins are listed by username in the ADMIN_USERS environment variable"""
+    load_dotenv()
+    admins = {name.strip() for name in os.getenv('ADMIN_USERS', '').split(',') if name.strip()}
+    return username in admins
+
+def dashboard_page():
+    st.markdown("## 📊 Usage Dashboard")
+
+    if st.session_state.db is None:
+        st.error("Database connection failed. Please check your configuration.")
+        return
+
+    if not is_admin(st.session_state.username):
+        st.warning("This page is only available to administrators.")
+        return
+
+    days = st.slider("Days to show", min_value=7, max_value=365, value=30)
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    since_day = (datetime.utcnow() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    conn = st.session_state.db.conn
+
+    usage = pd.DataFrame(daily_usage(conn, since_day),
+                         columns=["day", "prompts", "responses", "errors", "active_users"])
+    if usage.empty:
+        st.info("No usage recorded yet. Aggregates are refreshed in the background every minute.")
+        return
+
+    usage["error_rate"] = (usage["errors"] / usage["responses"].where(usage["responses"] > 0)).fillna(0)
+
+    total_responses = int(usage["responses"].sum())
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Prompts", int(usage["prompts"].sum()))
+    col2.metric("Error rate", f"{(usage['errors'].sum() / total_responses if total_responses else 0):.1%}")
+    col3.metric("Active users (today)", active_users(conn, today))
+
+    fig, (ax_prompts, ax_errors) = plt.subplots(2, 1, figsize=(10, 6), sharex=True)
+    ax_prompts.plot(usage["day"], usage["prompts"], marker="o", label="Prompts")
+    ax_prompts.plot(usage["day"], usage["active_users"], marker="o", label="Active users")
+    ax_prompts.legend()
+    ax_prompts.set_ylabel("Per day")
+    ax_errors.bar(usage["day"], usage["error_rate"], color="#E67E22")
+    ax_errors.set_ylabel("Error rate")
+    ax_errors.tick_params(axis="x", rotation=45)
+    fig.tight_layout()
+    st.pyplot(fig)
+    plt.close(fig)
+
+    col_left, col_right = st.columns(2)
+    with col_left:
+        st.markdown("### Top prompts")
+        st.dataframe(pd.DataFrame(top_prompts(conn, since_day), columns=["Prompt", "Count"]),
+                     use_container_width=True, hide_index=True)
+    with col_right:
+        st.markdown("### Prompts per user")
+        st.dataframe(pd.DataFrame(prompts_per_user(conn, since_day), columns=["User", "Prompts"]),
+                     use_container_width=True, hide_index=True)
+
+def session_memory_section():
+    """Bytes held by each live session's message store in this process"""
+    st.markdown("### Session memory")
+    report = pd.DataFrame(memory_report(), columns=["User", "Messages", "In memory", "Bytes"])
+    if report.empty:
+        st.info("No active sessions.")
+        return
+    st.metric("Total bytes", int(report["Bytes"].sum()))
+    st.dataframe(report, use_container_width=True, hide_index=True)
+
+dashboard_page()
+if st.session_state.db is not None and is_admin(st.session_state.username):
+    session_memory_section()
@@ -0,0 +1,71 @@
+import pandas as pd
+import streamlit as st
+
+from profiler import profiling_enabled, read_trace, trace_path
+
+st.set_page_config(
+    page_title="Render Profile - C Programming Assistant",
+    page_icon="⏱️",
+    layout="wide"
+)
+
+def profile_page():
+    st.markdown("## ⏱️ Render Profile")
+
+    if not profiling_enabled():
+        st.info("Profiling is off. Set RENDER_PROFILE=1 and restart the app to record reruns.")
+
+    records = read_trace()
+    if not records:
+        st.info(f"No reruns recorded yet in {trace_path()}.")
+        return
+
+    count = st.slider("Reruns to analyze", min_value=1, max_value=len(records), value=min(100, len(records)))
+    records = records[-count:]
+    pages = sorted({record["page"] for record in records})
+    selected = st.multiselect("Pages", pages, default=pages)
+    records = [record for record in records if record["page"] in selected]
+    if not records:
+        return
+
+    reruns = pd.DataFrame([
+        {"time": pd.to_datetime(record["time"], unit="s"), "page": record["page"],
+         "ms": record["ms"], "bytes": record["bytes"], "interrupted": record["interrupted"]}
+        for record in records
+    ])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Reruns", len(reruns))
+    col2.metric("Mean rerun time", f"{reruns['ms'].mean():.1f} ms")
+    col3.metric("Mean payload", f"{reruns['bytes'].mean() / 1024:.1f} KB")
+    st.line_chart(reruns.set_index("time")[["ms"]])
+
+    sections = pd.DataFrame([
+        {"page": record["page"], "section": section["name"], "ms": section["ms"], "bytes": section["bytes"]}
+        for record in records for section in record["sections"]
+    ])
+    if sections.empty:
+        return
+
+    st.markdown("### Per section (mean per rerun, nested sections are included in their parent)")
+    per_section = (sections.groupby(["page", "section"])
+                   .agg(runs=("ms", "size"), ms=("ms", "mean"), bytes=("bytes", "mean"))
+                   .sort_values("bytes", ascending=False)
+                   .reset_index())
+    st.dataframe(per_section, use_container_width=True, hide_index=True)
+    st.bar_chart(per_section.set_index("section")[["bytes"]])
+
+    st.markdown("### Per widget")
+    elements = pd.DataFrame([
+        {"section": section["name"], "widget": name, "count": counts[0], "bytes": counts[1], "ms": counts[2]}
+        for record in records for section in record["sections"]
+        for name, counts in section["elements"].items()
+    ])
+    if elements.empty:
+        return
+    per_widget = (elements.groupby(["section", "widget"])
+                  .agg(count=("count", "mean"), bytes=("bytes", "mean"), ms=("ms", "mean"))
+                  .sort_values("bytes", ascending=False)
+                  .reset_index())
+    st.dataframe(per_widget, use_container_width=True, hide_index=True)
+
+profile_page()
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Trace file and the size at which it is rotated to <file>.1
+DEFAULT_TRACE_FILE = 'render_trace.jsonl'
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def profiling_enabled():
+    return os.getenv('RENDER_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+def trace_path():
+    return os.getenv('RENDER_PROFILE_FILE', os.path.join(os.getcwd(), DEFAULT_TRACE_FILE))
+
+
+def _element_type(msg):
+    """Name of the widget/element a ForwardMsg carries, e.g. "markdown" or "button" """
+    if msg.WhichOneof('type') != 'delta':
+        return msg.WhichOneof('type') or 'other'
+    delta_type = msg.delta.WhichOneof('type')
+    if delta_type == 'new_element':
+        return msg.delta.new_element.WhichOneof('type') or 'element'
+    return delta_type or 'delta'
+
+
+class _Section:
+    __slots__ = ('name', 'started', 'ms', 'bytes', 'elements')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.ms = 0.0
+        self.bytes = 0
+        # element type -> [count, bytes, ms]
+        self.elements = {}
+
+
+class _Rerun:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.last_event = self.started
+        self.sections = []
+        self.stack = []
+        self.total_bytes = 0
+
+    def on_message(self, msg):
+        now = time.perf_counter()
+        size = msg.ByteSize()
+        self.total_bytes += size
+        if self.stack:
+            # Bytes and time are inclusive of nested sections; elements are
+            # listed under the innermost one
+            for open_section in self.stack:
+                open_section.bytes += size
+            section = self.stack[-1]
+            # Time since the previous message is charged to this element: it
+            # covers the Python work that built it
+            counts = section.elements.setdefault(_element_type(msg), [0, 0, 0.0])
+            counts[0] += 1
+            counts[1] += size
+            counts[2] += (now - max(self.last_event, section.started)) * 1000
+        self.last_event = now
+
+    def to_dict(self, interrupted):
+        return {
+            "time": time.time(),
+            "page": self.page,
+            "ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "bytes": self.total_bytes,
+            "interrupted": interrupted,
+            "sections": [
+                {
+                    "name": section.name,
+                    "ms": round(section.ms, 3),
+                    "bytes": section.bytes,
+                    "elements": {name: [count, size, round(ms, 3)]
+                                 for name, (count, size, ms) in section.elements.items()},
+                }
+                for section in self.sections
+            ],
+        }
+
+
+def _write_trace(record):
+    path = trace_path()
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    max_bytes = int(os.getenv('RENDER_PROFILE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    with _write_lock:
+        try:
+            if os.path.exists(path) and os.path.getsize(path) + len(line) > max_bytes:
+                os.replace(path, path + '.1')
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except Exception as e:
+            print(f"Error writing render trace: {str(e)}")
+
+
+@contextmanager
+def profile_rerun(page):
+    """Profile one script run of `page` when RENDER_PROFILE is set
+
+    Every message the run sends to the browser is counted by wrapping the
+    script run context's enqueue function, so payload bytes are exact.
+    """
+    if not profiling_enabled():
+        yield
+        return
+
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    rerun = _Rerun(page)
+    original_enqueue = getattr(ctx, '_enqueue', None)
+    if original_enqueue is not None:
+        def enqueue(msg):
+            rerun.on_message(msg)
+            original_enqueue(msg)
+        ctx._enqueue = enqueue
+    _local.rerun = rerun
+    interrupted = True
+    try:
+        yield
+        interrupted = False
+    finally:
+        # st.rerun() and st.stop() end the run with an exception; the record is
+        # still written, flagged as interrupted
+        _local.rerun = None
+        if original_enqueue is not None:
+            ctx._enqueue = original_enqueue
+        _write_trace(rerun.to_dict(interrupted))
+
+
+@contextmanager
+def profile_section(name):
+    """Attribute time and payload bytes of the enclosed block to `name`"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        yield
+        return
+    section = _Section(name)
+    if rerun.stack:
+        section.name = f"{rerun.stack[-1].name}/{name}"
+    rerun.sections.append(section)
+    rerun.stack.append(section)
+    try:
+        yield
+    finally:
+        rerun.stack.pop()
+        section.ms = (time.perf_counter() - section.started) * 1000
+
+
+def read_trace(limit=500):
+    """The newest `limit` records, oldest first, including the rotated file"""
+    path = trace_path()
+    lines = []
+    for candidate in (path + '.1', path):
+        try:
+            with open(candidate, encoding='utf-8') as f:
+                lines.extend(f.readlines())
+        except FileNotFoundError:
+            continue
+    records = []
+    for line in lines[-limit:]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
@@ -0,0 +1,213 @@
+import atexit
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from context_builder import estimate_tokens
+
+# Per-user daily limits; 0 disables a limit
+DEFAULT_DAILY_GENERATIONS = 200
+DEFAULT_DAILY_OUTPUT_TOKENS = 200000
+# Seconds between flushes of in-memory counters to usage_quota
+DEFAULT_FLUSH_INTERVAL = 10
+
+WATERMARK = 'quota.chat_history.id'
+
+
+def _today():
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+
+class QuotaAccountant:
+    """In-memory per-user usage counters, flushed to usage_quota in batches
+
+    check() and record() only touch memory. Totals for the current day are
+    loaded once at startup; flushes write the deltas accumulated since the
+    previous flush in one transaction.
+    """
+
+    def __init__(self, db_path, daily_generations=DEFAULT_DAILY_GENERATIONS,
+                 daily_output_tokens=DEFAULT_DAILY_OUTPUT_TOKENS):
+        self.db_path = db_path
+        self.daily_generations = daily_generations
+        self.daily_output_tokens = daily_output_tokens
+        # (user_id, day) -> [generations, prompt tokens, output tokens]
+        self._totals = {}
+        self._pending = {}
+        # chat_history id stored by the last flush
+        self._watermark = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+
+    def reconcile(self):
+        """Load today's totals and recover generations lost in a crash
+
+        Every flush also stores the highest chat_history id at that moment.
+        Gemini replies saved after it (rows with a model) were generated but
+        possibly never flushed, so they are counted again here, with their
+        output tokens estimated from the saved text. Snippet library and
+        offline answers have no model and are never counted. A reply whose usage was flushed just
+        before its message was saved may be counted twice; quotas err on the
+        side of over-counting.
+        """
+        day = _today()
+        conn = self._connect()
+        try:
+            totals = {}
+            for user_id, generations, prompt_tokens, output_tokens in conn.execute(
+                    'SELECT user_id, generations, prompt_tokens, output_tokens FROM usage_quota WHERE day = ?',
+                    (day,)):
+                totals[(user_id, day)] = [generations, prompt_tokens, output_tokens]
+
+            row = conn.execute('SELECT value FROM analytics_watermark WHERE name = ?',
+                               (WATERMARK,)).fetchone()
+            recovered = {}
+            if row is not None:
+                for user_id, message in conn.execute(
+                        '''
+                        SELECT user_id, message FROM chat_history
+                        WHERE id > ? AND role = 'assistant' AND model IS NOT NULL
+                          AND substr(timestamp, 1, 10) = ?
+                        ''',
+                        (row[0], day)):
+                    counts = recovered.setdefault((user_id, day), [0, 0, 0])
+                    counts[0] += 1
+                    counts[2] += estimate_tokens(message)
+
+            with self._lock:
+                self._totals = totals
+                for key, counts in recovered.items():
+                    self._add(key, counts)
+            if recovered:
+                print(f"Quota: recovered usage for {len(recovered)} users after restart")
+        except Exception as e:
+            print(f"Quota reconciliation error: {str(e)}")
+        finally:
+            conn.close()
+        # Persist what was recovered and move the watermark past it
+        self.flush()
+
+    def _add(self, key, counts):
+        for table in (self._totals, self._pending):
+            current = table.setdefault(key, [0, 0, 0])
+            for i, value in enumerate(counts):
+                current[i] += value
+
+    def check(self, user_id):
+        """Return None if `user_id` may generate now, else a message explaining the limit"""
+        with self._lock:
+            generations, _, output_tokens = self._totals.get((user_id, _today()), (0, 0, 0))
+        if self.daily_generations and generations >= self.daily_generations:
+            return f"Daily limit of {self.daily_generations} generations reached. Please try again tomorrow."
+        if self.daily_output_tokens and output_tokens >= self.daily_output_tokens:
+            return f"Daily limit of {self.daily_output_tokens} output tokens reached. Please try again tomorrow."
+        return None
+
+    def record(self, user_id, usage_metadata):
+        """Count one generation using the usageMetadata of a Gemini response"""
+        usage_metadata = usage_metadata or {}
+        counts = [1, usage_metadata.get('promptTokenCount', 0),
+                  usage_metadata.get('candidatesTokenCount', 0)]
+        with self._lock:
+            self._add((user_id, _today()), counts)
+
+    def usage(self, user_id):
+        with self._lock:
+            generations, prompt_tokens, output_tokens = self._totals.get((user_id, _today()), (0, 0, 0))
+        return {"generations": generations, "prompt_tokens": prompt_tokens,
+                "output_tokens": output_tokens}
+
+    def flush(self):
+        """Write pending deltas to usage_quota in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            # Forget finished days; their totals are on disk
+            today = _today()
+            self._totals = {key: value for key, value in self._totals.items() if key[1] == today}
+        conn = self._connect()
+        try:
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM chat_history').fetchone()[0]
+            if not pending and last_id == self._watermark:
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                '''
+                INSERT INTO usage_quota (user_id, day, generations, prompt_tokens, output_tokens)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, day) DO UPDATE SET
+                    generations = generations + excluded.generations,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    output_tokens = output_tokens + excluded.output_tokens
+                ''',
+                [(user_id, day, *counts) for (user_id, day), counts in pending.items()]
+            )
+            conn.execute(
+                '''
+                INSERT INTO analytics_watermark (name, value) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value
+                ''',
+                (WATERMARK, last_id)
+            )
+            conn.commit()
+            self._watermark = last_id
+        except Exception as e:
+            conn.rollback()
+            print(f"Quota flush error: {str(e)}")
+            # Keep the deltas for the next flush
+            with self._lock:
+                for key, counts in pending.items():
+                    current = self._pending.setdefault(key, [0, 0, 0])
+                    for i, value in enumerate(counts):
+                        current[i] += value
+        finally:
+            conn.close()
+
+    def _loop(self, interval):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def start(self, interval=DEFAULT_FLUSH_INTERVAL):
+        if self._thread and self._thread.is_alive():
+            return
+        self.reconcile()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                        name='quota-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+
+_accountant = None
+_accountant_lock = threading.Lock()
+
+
+def start_quota_accounting(db_path):
+    """Start the process-wide quota accountant once, configured from the environment"""
+    global _accountant
+    with _accountant_lock:
+        if _accountant is None:
+            _accountant = QuotaAccountant(
+                db_path,
+                daily_generations=int(os.getenv('QUOTA_DAILY_GENERATIONS', DEFAULT_DAILY_GENERATIONS)),
+                daily_output_tokens=int(os.getenv('QUOTA_DAILY_OUTPUT_TOKENS', DEFAULT_DAILY_OUTPUT_TOKENS)),
+            )
+            _accountant.start(int(os.getenv('QUOTA_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)))
+        return _accountant
+
+
+def get_quota_accountant():
+    """The running accountant, or None before start_quota_accounting()"""
+    return _accountant
@@ -0,0 +1,135 @@
+class CodeBlock:
+    __slots__ = ('language', 'code')
+
+    def __init__(self, language, code):
+        self.language = language
+        self.code = code
+
+    def __eq__(self, other):
+        return (isinstance(other, CodeBlock) and
+                (self.language, self.code) == (other.language, other.code))
+
+    def __repr__(self):
+        return f"CodeBlock(language={self.language!r}, code={len(self.code)} chars)"
+
+
+class ParsedResponse:
+    __slots__ = ('blocks', 'prose')
+
+    def __init__(self, blocks, prose):
+        self.blocks = blocks
+        self.prose = prose
+
+    def code(self, languages=('c', 'h', '')):
+        """Code of the blocks in `languages` (untagged blocks included), joined by blank lines"""
+        return '\n\n'.join(block.code for block in self.blocks if block.language in languages)
+
+
+def _fence(line):
+    """Return (fence char, run length, info string) if `line` is a code fence, else None"""
+    stripped = line.lstrip(' ')
+    if len(line) - len(stripped) > 3 or len(stripped) < 3:
+        return None
+    char = stripped[0]
+    if char not in '`~':
+        return None
+    run = len(stripped) - len(stripped.lstrip(char))
+    if run < 3:
+        return None
+    info = stripped[run:].strip()
+    # Backtick fences cannot have backticks in their info string
+    if char == '`' and '`' in info:
+        return None
+    return char, run, info
+
+
+class ResponseParser:
+    """Single-pass parser for Markdown model output, fed in arbitrary chunks
+
+    Splits the text into fenced code blocks (with their language tag) and the
+    prose around them. Each character is looked at a constant number of
+    times, so feeding a response in one piece or as a stream of chunks costs
+    the same and gives the same result.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._prose = []
+        self._blocks = []
+        # (fence char, run length, language, lines) while inside a block
+        self._open = None
+
+    def feed(self, chunk):
+        """Consume a chunk; returns the code blocks completed by it"""
+        completed = []
+        pieces = chunk.split('\n')
+        for piece in pieces[:-1]:
+            self._pending.append(piece)
+            block = self._line(''.join(self._pending))
+            self._pending = []
+            if block is not None:
+                completed.append(block)
+        if pieces[-1]:
+            self._pending.append(pieces[-1])
+        return completed
+
+    def _line(self, line):
+        if line.endswith('\r'):
+            line = line[:-1]
+        fence = _fence(line)
+        if self._open is None:
+            if fence is not None:
+                char, run, info = fence
+                language = info.split()[0].lower() if info else ''
+                self._open = (char, run, language, [])
+            else:
+                self._prose.append(line)
+            return None
+
+        char, run, language, lines = self._open
+        if fence is not None and fence[0] == char and fence[1] >= run and not fence[2]:
+            block = CodeBlock(language, '\n'.join(lines))
+            self._blocks.append(block)
+            self._open = None
+            return block
+        lines.append(line)
+        return None
+
+    def finish(self):
+        """Flush the last line and return the ParsedResponse"""
+        if self._pending:
+            self._line(''.join(self._pending))
+            self._pending = []
+        if self._open is not None:
+            # Output cut off mid-block (e.g. at maxOutputTokens): keep what arrived
+            char, run, language, lines = self._open
+            if lines:
+                # A closing fence glued to the last line, e.g. "int main(){}```"
+                last = lines[-1].rstrip()
+                code = last.rstrip(char)
+                if len(last) - len(code) >= run:
+                    if code.strip():
+                        lines[-1] = code.rstrip()
+                    else:
+                        lines.pop()
+            self._blocks.append(CodeBlock(language, '\n'.join(lines)))
+            self._open = None
+        return ParsedResponse(self._blocks, '\n'.join(self._prose).strip())
+
+
+def parse_response(text):
+    parser = ResponseParser()
+    parser.feed(text)
+    return parser.finish()
+
+
+def extract_code(text):
+    """C code from a model response; the whole text if it has no fenced blocks"""
+    parsed = parse_response(text)
+    if not parsed.blocks:
+        return text.strip()
+    code = parsed.code()
+    if not code:
+        code = '\n\n'.join(block.code for block in parsed.blocks)
+    return code.strip()
+
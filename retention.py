@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Turns older than this many days are moved out of chat_history
+DEFAULT_RETENTION_DAYS = 90
+# Seconds between background maintenance runs
+DEFAULT_INTERVAL = 3600
+# Rows moved per transaction, and pause between transactions, so archival
+# never holds the write lock long enough to stall live requests
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_PAUSE = 0.05
+# Free pages returned to the filesystem per incremental_vacuum step
+VACUUM_PAGES_PER_STEP = 256
+# Rows sampled per index by the ANALYZE that PRAGMA optimize runs
+ANALYSIS_LIMIT = 400
+# maintenance_state row holding the unix time archival is paused until
+PAUSE_KEY = 'archival.paused_until'
+
+
+def pack_turns(turns):
+    """Compress a list of (role, message, timestamp) rows into an archive blob"""
+    data = json.dumps([list(turn) for turn in turns], separators=(',', ':'))
+    return zlib.compress(data.encode('utf-8'), 6)
+
+
+def unpack_turns(blob):
+    """Inverse of pack_turns, returns a list of (role, message, timestamp) tuples"""
+    if not blob:
+        return []
+    return [tuple(turn) for turn in json.loads(zlib.decompress(blob).decode('utf-8'))]
+
+
+def incremental_vacuum_step(conn, pages=VACUUM_PAGES_PER_STEP):
+    """Return up to `pages` free pages to the filesystem
+
+    conn.execute() steps the pragma once, which frees a single page;
+    executescript() runs it to completion.
+    """
+    conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+
+
+def pause_archival(conn, seconds):
+    """Keep archival from moving rows until resume_archival() or `seconds` have passed
+
+    Takes the write lock, so it waits for an archival batch in progress and
+    no batch starts after it returns. Lets a reader walk both tiers without
+    rows moving between them.
+    """
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(
+            '''
+            INSERT INTO maintenance_state (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value
+            ''',
+            (PAUSE_KEY, time.time() + seconds)
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def resume_archival(conn):
+    conn.execute('DELETE FROM maintenance_state WHERE name = ?', (PAUSE_KEY,))
+    conn.commit()
+
+
+def _archival_paused(conn):
+    row = conn.execute('SELECT value FROM maintenance_state WHERE name = ?', (PAUSE_KEY,)).fetchone()
+    return row is not None and row[0] > time.time()
+
+
+class RetentionManager:
+    def __init__(self, db_path, retention_days=DEFAULT_RETENTION_DAYS,
+                 batch_size=DEFAULT_BATCH_SIZE, batch_pause=DEFAULT_BATCH_PAUSE):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._stop = threading.Event()
+        self._thread = None
+        self._vacuum_warned = False
+
+    def _connect(self):
+        # Maintenance uses its own connection so it never shares a cursor
+        # with a live session
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+
+    def archive_old_turns(self, conn):
+        """Move turns past the retention window into per user-month archive blobs"""
+        moved = 0
+        cutoff = f'-{int(self.retention_days)} days'
+        while not self._stop.is_set():
+            # Each batch is read and moved in one write transaction, so it is
+            # ordered strictly before or after a pause_archival() call
+            conn.execute('BEGIN IMMEDIATE')
+            rows = [] if _archival_paused(conn) else conn.execute(
+                '''
+                SELECT id, user_id, role, message, timestamp FROM chat_history
+                WHERE timestamp < datetime('now', ?)
+                  -- Only rows already counted by the usage aggregates (analytics.py)
+                  AND id <= COALESCE((SELECT value FROM analytics_watermark
+                                      WHERE name = 'chat_history.id'), 0)
+                ORDER BY id LIMIT ?
+                ''',
+                (cutoff, self.batch_size)
+            ).fetchall()
+            if not rows:
+                conn.rollback()
+                break
+
+            buckets = {}
+            for _, user_id, role, message, timestamp in rows:
+                month = str(timestamp)[:7]
+                buckets.setdefault((user_id, month), []).append((role, message, timestamp))
+
+            try:
+                for (user_id, month), turns in buckets.items():
+                    existing = conn.execute(
+                        'SELECT payload FROM chat_history_archive WHERE user_id IS ? AND month = ?',
+                        (user_id, month)
+                    ).fetchone()
+                    if existing:
+                        turns = unpack_turns(existing[0]) + turns
+                    conn.execute(
+                        '''
+                        INSERT INTO chat_history_archive (user_id, month, turn_count, payload)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(user_id, month) DO UPDATE SET
+                            turn_count = excluded.turn_count,
+                            payload = excluded.payload
+                        ''',
+                        (user_id, month, len(turns), pack_turns(turns))
+                    )
+                conn.executemany('DELETE FROM chat_history WHERE id = ?',
+                                 [(row[0],) for row in rows])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            moved += len(rows)
+            # Yield the write lock to live traffic between batches
+            time.sleep(self.batch_pause)
+        return moved
+
+    def vacuum(self, conn):
+        """Return free pages to the filesystem a few at a time"""
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            # Converting needs a full VACUUM that locks the database for the
+            # whole rebuild, so it is never done from here
+            if not self._vacuum_warned:
+                print("Retention: auto_vacuum is not incremental, skipping vacuum. "
+                      "Stop the app and run `python retention.py enable-incremental-vacuum` once.")
+                self._vacuum_warned = True
+            return
+        while not self._stop.is_set():
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if free_pages == 0:
+                break
+            incremental_vacuum_step(conn)
+            time.sleep(self.batch_pause)
+
+    def run_once(self):
+        """Run a single archive + vacuum + optimize pass"""
+        conn = self._connect()
+        try:
+            moved = self.archive_old_turns(conn)
+            self.vacuum(conn)
+            # Re-analyzes only tables whose statistics are stale, sampling at
+            # most ANALYSIS_LIMIT rows per index
+            conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+            conn.execute('PRAGMA optimize')
+            conn.commit()
+            if moved:
+                print(f"Retention: archived {moved} chat turns")
+            return moved
+        except Exception as e:
+            print(f"Retention maintenance error: {str(e)}")
+            return 0
+        finally:
+            conn.close()
+
+    def _loop(self, interval):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(interval)
+
+    def start(self, interval=DEFAULT_INTERVAL):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                        name='chat-retention', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def start_background_maintenance(db_path):
+    """Start the process-wide maintenance thread once, configured from the environment"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = RetentionManager(
+                db_path,
+                retention_days=int(os.getenv('CHAT_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)),
+            )
+            _manager.start(int(os.getenv('CHAT_MAINTENANCE_INTERVAL', DEFAULT_INTERVAL)))
+        return _manager
+
+
+def enable_incremental_vacuum(db_path):
+    """Switch an existing database to incremental auto_vacuum
+
+    Runs a full VACUUM, which rewrites the file and blocks every other
+    connection until it finishes; only run it while the app is stopped.
+    Databases created by migrations.py start in incremental mode already.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return False
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        return True
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline chat history maintenance")
+    parser.add_argument('--db', default=os.path.join(os.getcwd(), 'chat_app.db'),
+                        help="SQLite database path (default: ./chat_app.db)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('enable-incremental-vacuum',
+                          help="Rebuild the database in incremental auto_vacuum mode (app must be stopped)")
+
+    args = parser.parse_args()
+    if enable_incremental_vacuum(args.db):
+        print(f"{args.db} now uses incremental auto_vacuum")
+    else:
+        print(f"{args.db} already uses incremental auto_vacuum")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import json
+import os
+import re
+
+SNIPPET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snippets')
+
+# Words that say nothing about which program is wanted
+_STOPWORDS = {
+    'a', 'an', 'the', 'to', 'for', 'of', 'in', 'on', 'c', 'and', 'or', 'is', 'if',
+    'it', 'me', 'my', 'please', 'write', 'program', 'create', 'code', 'using',
+    'make', 'give', 'show', 'that', 'this', 'which', 'how', 'can', 'you', 'i',
+    'simple', 'basic', 'language', 'function', 'given',
+}
+_IRREGULAR = {'matrices': 'matrix', 'indices': 'index'}
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def _normalize(word):
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, singularized content words of `text`"""
+    return [_normalize(word) for word in _TOKEN_RE.findall(text.lower())
+            if word not in _STOPWORDS]
+
+
+class SnippetLibrary:
+    def __init__(self, directory=SNIPPET_DIR):
+        self.snippets = []
+        # token -> ids of snippets with a keyword phrase containing it
+        self.index = {}
+        self._load(directory)
+
+    def _load(self, directory):
+        try:
+            with open(os.path.join(directory, 'manifest.json')) as f:
+                manifest = json.load(f)
+            for entry in manifest:
+                with open(os.path.join(directory, entry['file'])) as f:
+                    code = f.read().strip()
+                phrases = [tokenize(keyword) for keyword in entry['keywords']]
+                vocabulary = set(tokenize(' '.join(entry.get('vocabulary', []))))
+                for phrase in phrases:
+                    vocabulary.update(phrase)
+                snippet_id = len(self.snippets)
+                self.snippets.append({
+                    'title': entry['title'],
+                    'code': code,
+                    'phrases': phrases,
+                    'vocabulary': vocabulary,
+                })
+                for phrase in phrases:
+                    for token in phrase:
+                        self.index.setdefault(token, set()).add(snippet_id)
+            print(f"Snippet library loaded: {len(self.snippets)} programs")
+        except Exception as e:
+            print(f"Error loading snippet library: {str(e)}")
+
+    def lookup(self, prompt, strict=True):
+        """Return the best matching snippet, or None
+
+        A snippet matches when every word of one of its keyword phrases is in
+        the prompt. In strict mode every other word of the prompt must also be
+        part of the snippet's vocabulary, so "bubble sort in descending order"
+        still goes to the model; the loose mode is for when the model is
+        unavailable and an approximate answer is better than none.
+        """
+        tokens = set(tokenize(prompt))
+        candidates = set()
+        for token in tokens:
+            candidates.update(self.index.get(token, ()))
+
+        best, best_coverage = None, 0.0
+        for snippet_id in candidates:
+            snippet = self.snippets[snippet_id]
+            if not any(all(token in tokens for token in phrase) for phrase in snippet['phrases']):
+                continue
+            coverage = len(tokens & snippet['vocabulary']) / len(tokens)
+            if strict and coverage < 1.0:
+                continue
+            if coverage > best_coverage:
+                best, best_coverage = snippet, coverage
+        return best
@@ -0,0 +1,57 @@
+/* Binary search for a value in a sorted array */
+#include <stdio.h>
+
+/* Return the index of `target` in sorted arr[0..n-1], or -1 if absent */
+int binary_search(const int arr[], int n, int target)
+{
+    int low = 0;
+    int high = n - 1;
+    while (low <= high) {
+        int mid = low + (high - low) / 2;
+        if (arr[mid] == target) {
+            return mid;
+        }
+        if (arr[mid] < target) {
+            low = mid + 1;
+        } else {
+            high = mid - 1;
+        }
+    }
+    return -1;
+}
+
+int main(void)
+{
+    int n, target;
+    int arr[1000];
+
+    printf("Enter the number of elements: ");
+    if (scanf("%d", &n) != 1 || n <= 0 || n > 1000) {
+        fprintf(stderr, "Invalid size (expected 1-1000)\n");
+        return 1;
+    }
+    printf("Enter %d integers in ascending order: ", n);
+    for (int i = 0; i < n; i++) {
+        if (scanf("%d", &arr[i]) != 1) {
+            fprintf(stderr, "Invalid input\n");
+            return 1;
+        }
+        if (i > 0 && arr[i] < arr[i - 1]) {
+            fprintf(stderr, "Array must be sorted in ascending order\n");
+            return 1;
+        }
+    }
+    printf("Enter the value to search for: ");
+    if (scanf("%d", &target) != 1) {
+        fprintf(stderr, "Invalid input\n");
+        return 1;
+    }
+
+    int index = binary_search(arr, n, target);
+    if (index >= 0) {
+        printf("%d found at index %d\n", target, index);
+    } else {
+        printf("%d not found\n", target);
+    }
+    return 0;
+}
@@ -0,0 +1,55 @@
+/* Sort an array of integers using bubble sort */
+#include <stdio.h>
+
+/* Sort arr[0..n-1] in ascending order; stops early once a pass makes no swaps */
+void bubble_sort(int arr[], int n)
+{
+    for (int i = 0; i < n - 1; i++) {
+        int swapped = 0;
+        for (int j = 0; j < n - 1 - i; j++) {
+            if (arr[j] > arr[j + 1]) {
+                int tmp = arr[j];
+                arr[j] = arr[j + 1];
+                arr[j + 1] = tmp;
+                swapped = 1;
+            }
+        }
+        if (!swapped) {
+            break;
+        }
+    }
+}
+
+void print_array(const int arr[], int n)
+{
+    for (int i = 0; i < n; i++) {
+        printf("%d ", arr[i]);
+    }
+    printf("\n");
+}
+
+int main(void)
+{
+    int n;
+
+    printf("Enter the number of elements: ");
+    if (scanf("%d", &n) != 1 || n <= 0 || n > 1000) {
+        fprintf(stderr, "Invalid size (expected 1-1000)\n");
+        return 1;
+    }
+
+    int arr[1000];
+    printf("Enter %d integers: ", n);
+    for (int i = 0; i < n; i++) {
+        if (scanf("%d", &arr[i]) != 1) {
+            fprintf(stderr, "Invalid input\n");
+            return 1;
+        }
+    }
+
+    bubble_sort(arr, n);
+
+    printf("Sorted array: ");
+    print_array(arr, n);
+    return 0;
+}
@@ -0,0 +1,34 @@
+/* Compute the factorial of a non-negative integer */
+#include <stdio.h>
+
+/* Iterative factorial; 20! is the largest value that fits in 64 bits */
+unsigned long long factorial(int n)
+{
+    unsigned long long result = 1;
+    for (int i = 2; i <= n; i++) {
+        result *= (unsigned long long)i;
+    }
+    return result;
+}
+
+int main(void)
+{
+    int n;
+
+    printf("Enter a non-negative integer (0-20): ");
+    if (scanf("%d", &n) != 1) {
+        fprintf(stderr, "Invalid input\n");
+        return 1;
+    }
+    if (n < 0) {
+        fprintf(stderr, "Factorial is not defined for negative numbers\n");
+        return 1;
+    }
+    if (n > 20) {
+        fprintf(stderr, "Result would overflow a 64-bit integer\n");
+        return 1;
+    }
+
+    printf("%d! = %llu\n", n, factorial(n));
+    return 0;
+}
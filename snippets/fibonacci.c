@@ -0,0 +1,25 @@
+/* Print the first n terms of the Fibonacci series */
+#include <stdio.h>
+
+int main(void)
+{
+    int n;
+
+    printf("Enter the number of terms (1-93): ");
+    if (scanf("%d", &n) != 1 || n <= 0 || n > 93) {
+        fprintf(stderr, "Invalid input (expected 1-93)\n");
+        return 1;
+    }
+
+    /* F(93) is the largest Fibonacci number that fits in 64 bits */
+    unsigned long long a = 0, b = 1;
+    printf("Fibonacci series: ");
+    for (int i = 0; i < n; i++) {
+        printf("%llu ", a);
+        unsigned long long next = a + b;
+        a = b;
+        b = next;
+    }
+    printf("\n");
+    return 0;
+}
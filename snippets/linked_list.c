@@ -0,0 +1,113 @@
+/* Singly linked list with insertion, deletion, search and traversal */
+#include <stdio.h>
+#include <stdlib.h>
+
+struct Node {
+    int data;
+    struct Node *next;
+};
+
+/* Allocate a new node; exits on allocation failure */
+struct Node *create_node(int data)
+{
+    struct Node *node = malloc(sizeof(*node));
+    if (node == NULL) {
+        fprintf(stderr, "Memory allocation failed\n");
+        exit(EXIT_FAILURE);
+    }
+    node->data = data;
+    node->next = NULL;
+    return node;
+}
+
+void insert_at_beginning(struct Node **head, int data)
+{
+    struct Node *node = create_node(data);
+    node->next = *head;
+    *head = node;
+}
+
+void insert_at_end(struct Node **head, int data)
+{
+    struct Node *node = create_node(data);
+    if (*head == NULL) {
+        *head = node;
+        return;
+    }
+    struct Node *current = *head;
+    while (current->next != NULL) {
+        current = current->next;
+    }
+    current->next = node;
+}
+
+/* Remove the first node holding `data`; returns 1 if a node was removed */
+int delete_node(struct Node **head, int data)
+{
+    struct Node **link = head;
+    while (*link != NULL) {
+        if ((*link)->data == data) {
+            struct Node *victim = *link;
+            *link = victim->next;
+            free(victim);
+            return 1;
+        }
+        link = &(*link)->next;
+    }
+    return 0;
+}
+
+/* Return the 0-based position of `data`, or -1 if it is not in the list */
+int search(const struct Node *head, int data)
+{
+    int index = 0;
+    for (const struct Node *current = head; current != NULL; current = current->next) {
+        if (current->data == data) {
+            return index;
+        }
+        index++;
+    }
+    return -1;
+}
+
+void print_list(const struct Node *head)
+{
+    for (const struct Node *current = head; current != NULL; current = current->next) {
+        printf("%d -> ", current->data);
+    }
+    printf("NULL\n");
+}
+
+void free_list(struct Node **head)
+{
+    struct Node *current = *head;
+    while (current != NULL) {
+        struct Node *next = current->next;
+        free(current);
+        current = next;
+    }
+    *head = NULL;
+}
+
+int main(void)
+{
+    struct Node *head = NULL;
+
+    insert_at_end(&head, 10);
+    insert_at_end(&head, 20);
+    insert_at_end(&head, 30);
+    insert_at_beginning(&head, 5);
+
+    printf("Linked list: ");
+    print_list(head);
+
+    printf("Position of 20: %d\n", search(head, 20));
+
+    if (delete_node(&head, 20)) {
+        printf("Deleted 20: ");
+        print_list(head);
+    }
+
+    free_list(&head);
+    return 0;
+}
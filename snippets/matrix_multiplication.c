@@ -0,0 +1,67 @@
+/* Multiply two matrices entered by the user */
+#include <stdio.h>
+
+#define MAX 10
+
+int read_matrix(int m[MAX][MAX], int rows, int cols, const char *name)
+{
+    printf("Enter the elements of matrix %s (%d x %d):\n", name, rows, cols);
+    for (int i = 0; i < rows; i++) {
+        for (int j = 0; j < cols; j++) {
+            if (scanf("%d", &m[i][j]) != 1) {
+                return 0;
+            }
+        }
+    }
+    return 1;
+}
+
+/* result = a (r1 x c1) * b (c1 x c2) */
+void multiply(int a[MAX][MAX], int b[MAX][MAX], int result[MAX][MAX], int r1, int c1, int c2)
+{
+    for (int i = 0; i < r1; i++) {
+        for (int j = 0; j < c2; j++) {
+            result[i][j] = 0;
+            for (int k = 0; k < c1; k++) {
+                result[i][j] += a[i][k] * b[k][j];
+            }
+        }
+    }
+}
+
+int main(void)
+{
+    int a[MAX][MAX], b[MAX][MAX], result[MAX][MAX];
+    int r1, c1, r2, c2;
+
+    printf("Enter rows and columns of matrix A: ");
+    if (scanf("%d %d", &r1, &c1) != 2 || r1 <= 0 || c1 <= 0 || r1 > MAX || c1 > MAX) {
+        fprintf(stderr, "Invalid dimensions (expected 1-%d)\n", MAX);
+        return 1;
+    }
+    printf("Enter rows and columns of matrix B: ");
+    if (scanf("%d %d", &r2, &c2) != 2 || r2 <= 0 || c2 <= 0 || r2 > MAX || c2 > MAX) {
+        fprintf(stderr, "Invalid dimensions (expected 1-%d)\n", MAX);
+        return 1;
+    }
+    if (c1 != r2) {
+        fprintf(stderr, "Cannot multiply: columns of A (%d) must equal rows of B (%d)\n", c1, r2);
+        return 1;
+    }
+
+    if (!read_matrix(a, r1, c1, "A") || !read_matrix(b, r2, c2, "B")) {
+        fprintf(stderr, "Invalid input\n");
+        return 1;
+    }
+
+    multiply(a, b, result, r1, c1, c2);
+
+    printf("Result (%d x %d):\n", r1, c2);
+    for (int i = 0; i < r1; i++) {
+        for (int j = 0; j < c2; j++) {
+            printf("%d\t", result[i][j]);
+        }
+        printf("\n");
+    }
+    return 0;
+}
@@ -0,0 +1,49 @@
+/* Check whether a string is a palindrome, ignoring case and non-alphanumeric characters */
+#include <ctype.h>
+#include <stdio.h>
+#include <string.h>
+
+/* Return 1 if `str` reads the same forwards and backwards, 0 otherwise */
+int is_palindrome(const char *str)
+{
+    size_t len = strlen(str);
+    if (len == 0) {
+        return 1;
+    }
+
+    size_t left = 0;
+    size_t right = len - 1;
+    while (left < right) {
+        if (!isalnum((unsigned char)str[left])) {
+            left++;
+        } else if (!isalnum((unsigned char)str[right])) {
+            right--;
+        } else {
+            if (tolower((unsigned char)str[left]) != tolower((unsigned char)str[right])) {
+                return 0;
+            }
+            left++;
+            right--;
+        }
+    }
+    return 1;
+}
+
+int main(void)
+{
+    char str[1024];
+
+    printf("Enter a string: ");
+    if (fgets(str, sizeof(str), stdin) == NULL) {
+        fprintf(stderr, "Failed to read input\n");
+        return 1;
+    }
+    str[strcspn(str, "\n")] = '\0';
+
+    if (is_palindrome(str)) {
+        printf("\"%s\" is a palindrome\n", str);
+    } else {
+        printf("\"%s\" is not a palindrome\n", str);
+    }
+    return 0;
+}
@@ -0,0 +1,40 @@
+/* Check whether a number is prime */
+#include <stdio.h>
+
+/* Trial division by 2, 3 and then 6k +/- 1 up to sqrt(n) */
+int is_prime(long long n)
+{
+    if (n < 2) {
+        return 0;
+    }
+    if (n < 4) {
+        return 1;
+    }
+    if (n % 2 == 0 || n % 3 == 0) {
+        return 0;
+    }
+    for (long long i = 5; i <= n / i; i += 6) {
+        if (n % i == 0 || n % (i + 2) == 0) {
+            return 0;
+        }
+    }
+    return 1;
+}
+
+int main(void)
+{
+    long long n;
+
+    printf("Enter an integer: ");
+    if (scanf("%lld", &n) != 1) {
+        fprintf(stderr, "Invalid input\n");
+        return 1;
+    }
+
+    if (is_prime(n)) {
+        printf("%lld is a prime number\n", n);
+    } else {
+        printf("%lld is not a prime number\n", n);
+    }
+    return 0;
+}
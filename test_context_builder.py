@@ -0,0 +1,46 @@
+from context_builder import DEFAULT_CONTEXT_BUDGET, SUMMARY_SHARE, ContextBuilder, estimate_tokens
+
+VERBATIM_BUDGET = DEFAULT_CONTEXT_BUDGET - int(DEFAULT_CONTEXT_BUDGET * SUMMARY_SHARE)
+
+
+def _long_reply(lines):
+    body = '\n'.join(f'    table[{i}] = lookup(table, {i}, "entry number {i}");' for i in range(lines))
+    return f'#include <stdio.h>\n\nint build_table(int *table) {{\n{body}\n    return 0;\n}}\n/* end of file */'
+
+
+def test_oversized_newest_turn_is_sent_truncated():
+    reply = _long_reply(300)
+    assert estimate_tokens(reply) > VERBATIM_BUDGET
+    history = [{"role": "user", "content": "write a lookup table"},
+               {"role": "assistant", "content": reply}]
+
+    summary, recent = ContextBuilder().build('c1', history)
+
+    assert len(recent) == 1 and recent[0]["role"] == "assistant"
+    assert estimate_tokens(recent[0]["content"]) <= VERBATIM_BUDGET
+    assert recent[0]["content"].startswith('#include <stdio.h>')
+    assert recent[0]["content"].endswith('/* end of file */')
+    assert 'characters omitted' in recent[0]["content"]
+    assert 'build_table' not in (summary or '')
+
+
+def test_oversized_turn_is_summarized_once_a_newer_turn_fits():
+    builder = ContextBuilder()
+    history = [{"role": "user", "content": "write a lookup table"},
+               {"role": "assistant", "content": _long_reply(300)}]
+    builder.build('c1', history)
+    history += [{"role": "user", "content": "now make it recursive"},
+                {"role": "assistant", "content": "int f(void) { return 0; }"}]
+
+    summary, recent = builder.build('c1', history)
+
+    assert 'build_table' in summary
+    assert [turn["content"] for turn in recent] == ["now make it recursive", "int f(void) { return 0; }"]
+
+
+def test_turns_within_budget_are_sent_verbatim():
+    history = [{"role": "user", "content": "factorial"},
+               {"role": "assistant", "content": "int fact(int n) { return n < 2 ? 1 : n * fact(n - 1); }"}]
+    summary, recent = ContextBuilder().build('c1', history)
+    assert summary is None
+    assert recent == history
@@ -0,0 +1,35 @@
+import sqlite3
+
+from migrations import MIGRATIONS, check_query_plans, migrate
+
+
+def test_every_database_query_uses_an_index():
+    assert check_query_plans() == []
+
+
+class _StaleVersionConnection:
+    """Reports user_version 0 once, as a process that read it before another migrated"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.stale = True
+
+    def execute(self, sql, *args):
+        if sql == 'PRAGMA user_version' and self.stale:
+            self.stale = False
+            return self.conn.execute('SELECT 0')
+        return self.conn.execute(sql, *args)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+
+def test_migration_applied_by_another_process_is_skipped(tmp_path):
+    path = tmp_path / 'chat.db'
+    migrate(sqlite3.connect(path))
+    late = _StaleVersionConnection(sqlite3.connect(path))
+    assert migrate(late) == MIGRATIONS[-1][0]
+    assert late.conn.execute('PRAGMA user_version').fetchone()[0] == MIGRATIONS[-1][0]
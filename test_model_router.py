@@ -0,0 +1,45 @@
+import pytest
+
+from model_router import FOLLOW_UP_TOKENS, ModelRouter, classify_prompt
+
+
+@pytest.mark.parametrize('prompt', [
+    "Write a thread-safe hash map",
+    "Implement a TCP server using sockets",
+    "Build a trie with insert and delete",
+    "Write a simple shell that runs commands through pipes",
+    "LRU cache with O(1) operations",
+])
+def test_complex_prompts(prompt):
+    assert classify_prompt(prompt) == "complex"
+
+
+@pytest.mark.parametrize('prompt', [
+    "Write a program to retrieve entries from an array",
+    "Implement shell sort",
+    "Explain a pipeline of loops over an array",
+    "Write a program to find factorial of a number",
+])
+def test_keywords_match_whole_words_only(prompt):
+    assert classify_prompt(prompt) == "simple"
+
+
+def test_follow_up_to_a_complex_prompt_stays_complex():
+    turns = [{"role": "user", "content": "Write a thread-safe hash map"},
+             {"role": "assistant", "content": "int put(void) { return 0; }"}]
+    assert classify_prompt("add resize support") == "simple"
+    assert classify_prompt("add resize support", turns) == "complex"
+
+
+def test_follow_up_to_a_long_reply_gets_the_complex_budget():
+    reply = ' '.join(['word'] * (FOLLOW_UP_TOKENS + 1))
+    turns = [{"role": "user", "content": "bubble sort"}, {"role": "assistant", "content": reply}]
+    tier, max_output_tokens, _ = ModelRouter().plan("now make it recursive", turns)
+    assert tier == "complex"
+    assert max_output_tokens == ModelRouter().routes["complex"]["max_output_tokens"]
+
+
+def test_follow_up_to_a_short_simple_exchange_stays_simple():
+    turns = [{"role": "user", "content": "bubble sort"},
+             {"role": "assistant", "content": "void sort(int *a, int n) { }"}]
+    assert classify_prompt("now make it recursive", turns) == "simple"
@@ -0,0 +1,96 @@
+import random
+import time
+
+import pytest
+
+from response_parser import CodeBlock, ResponseParser, extract_code, parse_response
+
+LANGUAGES = ['c', 'C', 'cpp', '', 'text', 'c title="x"']
+FENCES = ['```', '````', '~~~']
+
+
+def _synthetic_response(rng, blocks):
+    """Return (text, expected code blocks) for a response with `blocks` fenced blocks"""
+    parts = []
+    expected = []
+    for i in range(blocks):
+        parts.append(f"Step {i}: here is some explanation with `inline code` and ``` in prose.\n")
+        info = rng.choice(LANGUAGES)
+        body = '\n'.join(f'    printf("%d\\n", {j}); /* ~~~ */' for j in range(rng.randint(1, 60)))
+        fence = rng.choice(FENCES)
+        parts.append(f"{fence}{info}\n{body}\n{fence}\n")
+        expected.append(CodeBlock(info.split()[0].lower() if info else '', body))
+    return ''.join(parts), expected
+
+
+def _chunked(text, rng):
+    position = 0
+    while position < len(text):
+        size = rng.choice([1, 2, 3, 7, 64, 4096])
+        yield text[position:position + size]
+        position += size
+
+
+def _parse_chunked(text, rng):
+    parser = ResponseParser()
+    for chunk in _chunked(text, rng):
+        parser.feed(chunk)
+    return parser.finish()
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_blocks_match_what_was_generated(seed):
+    rng = random.Random(seed)
+    text, expected = _synthetic_response(rng, rng.randint(0, 8))
+    for parsed in (parse_response(text), _parse_chunked(text, rng)):
+        assert parsed.blocks == expected
+        assert '```' not in parsed.code(('c', 'cpp', 'text', ''))
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_truncated_output_parses_the_same_whole_and_chunked(seed):
+    rng = random.Random(seed)
+    text, _ = _synthetic_response(rng, rng.randint(1, 8))
+    text = text[:rng.randint(0, len(text))]
+    whole = parse_response(text)
+    streamed = _parse_chunked(text, rng)
+    assert whole.blocks == streamed.blocks
+    assert whole.prose == streamed.prose
+
+
+def test_extract_code_prefers_c_blocks():
+    text = "Intro\n```python\nprint(1)\n```\n```c\nint main(void) { return 0; }\n```\nDone."
+    assert extract_code(text) == "int main(void) { return 0; }"
+
+
+def test_extract_code_without_fences_returns_text():
+    assert extract_code("  int x = 1;\n") == "int x = 1;"
+
+
+@pytest.mark.parametrize('text', [
+    "```c\nint main(){}```",
+    "```c\nint main(){}```\n",
+    "```c\nint main(){}  ````",
+    "~~~c\nint main(){}~~~",
+])
+def test_closing_fence_glued_to_last_line_is_stripped(text):
+    assert extract_code(text) == "int main(){}"
+
+
+def test_cut_off_block_keeps_what_arrived():
+    assert extract_code("```c\nint main(void) {\n    return 0;") == "int main(void) {\n    return 0;"
+
+
+def benchmark(seed=0):
+    rng = random.Random(seed)
+    for blocks in (10, 100, 1000):
+        text, _ = _synthetic_response(rng, blocks)
+        started = time.perf_counter()
+        parsed = parse_response(text)
+        elapsed = time.perf_counter() - started
+        print(f"Benchmark: {len(text) / 1e6:.2f} MB, {len(parsed.blocks)} blocks "
+              f"in {elapsed * 1000:.1f} ms ({len(text) / elapsed / 1e6:.0f} MB/s)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,51 @@
+import sqlite3
+
+from migrations import migrate
+from retention import (VACUUM_PAGES_PER_STEP, RetentionManager, incremental_vacuum_step,
+                       pause_archival, resume_archival)
+
+
+def _database_with_free_pages(path, pages):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('CREATE TABLE filler (data BLOB)')
+    conn.executemany('INSERT INTO filler VALUES (?)', [(b'x' * 4000,) for _ in range(pages)])
+    conn.commit()
+    conn.execute('DELETE FROM filler')
+    conn.commit()
+    return conn
+
+
+def test_vacuum_step_frees_a_full_step(tmp_path):
+    conn = _database_with_free_pages(tmp_path / 'chat.db', 2 * VACUUM_PAGES_PER_STEP + 10)
+    before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    assert before > VACUUM_PAGES_PER_STEP
+    incremental_vacuum_step(conn)
+    after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    assert before - after == VACUUM_PAGES_PER_STEP
+
+
+def test_vacuum_empties_the_freelist(tmp_path):
+    path = tmp_path / 'chat.db'
+    conn = _database_with_free_pages(path, 3 * VACUUM_PAGES_PER_STEP)
+    RetentionManager(str(path), batch_pause=0).vacuum(conn)
+    assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+
+
+def test_paused_archival_moves_nothing_until_resumed(tmp_path):
+    path = str(tmp_path / 'chat.db')
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO chat_history (user_id, role, message, timestamp) VALUES (1, 'user', ?, datetime('now', '-200 days'))",
+        [(f'message {i}',) for i in range(10)]
+    )
+    # Every row has been counted by the usage aggregates
+    conn.execute("INSERT INTO analytics_watermark (name, value) VALUES ('chat_history.id', 10)")
+    conn.commit()
+    manager = RetentionManager(path, batch_pause=0)
+
+    pause_archival(conn, 60)
+    assert manager.archive_old_turns(sqlite3.connect(path)) == 0
+    resume_archival(conn)
+    assert manager.archive_old_turns(sqlite3.connect(path)) == 10